@@ -0,0 +1,389 @@
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import http_client
+import hub_fee_monitor_v41 as hub
+from height_index import HeightIndex
+from height_ranges import HeightRanges
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+
+BACKFILL_DIR = "backfill"
+BACKFILL_WORKERS = 4
+SHARDS_PER_WORKER = 4       # shards plus petits que nécessaire -> meilleur équilibrage
+MAX_ROUNDS = 3              # relances des shards incomplets (worker planté, endpoint KO) avant d'abandonner
+LEGACY_LEDGER = "merged.json"   # ancien registre des plages fusionnées, reversé dans hub.STATE_FILE
+
+
+# ------------------------------------------------------------
+# Shards
+# ------------------------------------------------------------
+#
+# backfill/<run name>/shard_<lo>_<hi>.json holds one shard's checkpoint:
+# {"lo", "hi", "next": first height still to scan, "by_date": partial aggregates}.
+# It is rewritten (tmp + rename) after every committed chunk, so a crashed worker
+# resumes from its last chunk and never counts a block twice.
+
+def run_dir(name: str) -> str:
+    return os.path.join(BACKFILL_DIR, name)
+
+def shard_path(directory: str, lo: int, hi: int) -> str:
+    return os.path.join(directory, f"shard_{lo}_{hi}.json")
+
+def split_range(start: int, end: int, n: int) -> list:
+    n = max(1, min(n, end - start + 1))
+    size, extra = divmod(end - start + 1, n)
+    shards = []
+    lo = start
+    for i in range(n):
+        hi = lo + size - 1 + (1 if i < extra else 0)
+        shards.append((lo, hi))
+        lo = hi + 1
+    return shards
+
+def load_shard(path: str, lo: int, hi: int) -> dict:
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"lo": lo, "hi": hi, "next": lo, "by_date": {}}
+
+def save_shard(path: str, shard: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(shard, f, sort_keys=True)
+    os.replace(tmp, path)
+
+def split_ranges(ranges: list, n: int) -> list:
+    """About n shards over several height ranges, proportionally to their sizes."""
+    total = sum(hi - lo + 1 for lo, hi in ranges)
+    shards = []
+    for lo, hi in ranges:
+        shards += split_range(lo, hi, max(1, round(n * (hi - lo + 1) / total)))
+    return shards
+
+def plan_shards(directory: str, ranges: list, workers: int) -> list:
+    """Shards of an interrupted run are reused as-is, whatever the number of workers now."""
+    os.makedirs(directory, exist_ok=True)
+    existing = []
+    for name in os.listdir(directory):
+        if name.startswith("shard_") and name.endswith(".json"):
+            lo, hi = name[len("shard_"):-len(".json")].split("_")
+            existing.append((int(lo), int(hi)))
+    return sorted(existing) or split_ranges(ranges, workers * SHARDS_PER_WORKER)
+
+
+# ------------------------------------------------------------
+# Worker
+# ------------------------------------------------------------
+
+def _init_worker():
+    # pas de sockets hérités du parent, pas de process pool imbriqué
+    http_client.close()
+    hub.DECODE_WORKERS = 1
+
+def run_shard(directory: str, lo: int, hi: int) -> tuple:
+    """Scan one shard from its checkpoint; returns (lo, hi, next height to scan)."""
+    path = shard_path(directory, lo, hi)
+    shard = load_shard(path, lo, hi)
+    if shard["next"] > hi:
+        return lo, hi, shard["next"]
+
+    by_date = shard["by_date"]
+
+    def checkpoint(last: int):
+        shard["next"] = last + 1
+        save_shard(path, shard)
+
+    save_shard(path, shard)
+    if hub.ASYNC_SCAN:
+        asyncio.run(hub.scan_range_async(shard["next"], hi, by_date, checkpoint))
+    else:
+        hub.scan_range(shard["next"], hi, by_date, checkpoint)
+    return lo, hi, shard["next"]
+
+
+# ------------------------------------------------------------
+# Merge
+# ------------------------------------------------------------
+
+def merge_shards(directory: str, shards: list) -> dict:
+    """Sum the per-date aggregates of all shards, in shard order."""
+    by_date = {}
+    for lo, hi in shards:
+        shard = load_shard(shard_path(directory, lo, hi), lo, hi)
+        for date, stats in sorted(shard["by_date"].items()):
+            day = by_date.setdefault(date, hub.new_day_stats())
+            for k, v in stats.items():
+                day[k] += v
+    return by_date
+
+def migrate_ledger():
+    """Fold the ranges of the old backfill/merged.json ledger into the state file, once."""
+    path = os.path.join(BACKFILL_DIR, LEGACY_LEDGER)
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        merged = [tuple(r) for r in json.load(f)]
+    if merged:
+        hub.mark_done(merged)
+    os.remove(path)
+
+def already_done(ranges: list) -> list:
+    """The ranges of which some heights are already counted in OUTFILE (per hub.STATE_FILE)."""
+    state = hub.load_state()
+    if not state:
+        return []
+    return [(lo, hi) for lo, hi in ranges if state["done"].intersects(lo, hi)]
+
+
+# ------------------------------------------------------------
+# Backfill
+# ------------------------------------------------------------
+
+def backfill(ranges: list, workers: int = BACKFILL_WORKERS, name: str = None, check_csv: bool = True) -> bool:
+    """
+    Scan the height ranges [(lo, hi), ...] in parallel shards and merge them into OUTFILE
+    once all are complete. Returns False if some shards are still incomplete
+    (run the same command again to resume). Ranges that intersect heights already done
+    in hub.STATE_FILE are refused, and so are (with `check_csv`) ranges whose dates have
+    CSV rows the state file doesn't account for.
+    """
+    ranges = sorted(ranges)
+    migrate_ledger()
+    already = already_done(ranges)
+    if already:
+        raise RuntimeError(f"{ranges} recouvre des hauteurs déjà comptées ({hub.STATE_FILE}): {already}")
+    if check_csv:
+        dates = unbacked_rows(ranges)
+        if dates:
+            raise RuntimeError(f"{ranges} touche des jours déjà présents dans {hub.OUTFILE} sans que "
+                               f"{hub.STATE_FILE} dise quelles hauteurs ils contiennent: {', '.join(dates)} "
+                               f"-> vérifier ces lignes à la main ou passer par --dates")
+
+    directory = run_dir(name or "_".join(f"{lo}-{hi}" for lo, hi in ranges))
+    shards = plan_shards(directory, ranges, workers)
+    n_heights = sum(hi - lo + 1 for lo, hi in ranges)
+    print(f"Backfill {len(ranges)} plages ({n_heights} hauteurs): {len(shards)} shards, {workers} workers ({directory})")
+
+    todo = list(shards)
+    for attempt in range(1, MAX_ROUNDS + 1):
+        failed = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = {pool.submit(run_shard, directory, lo, hi): (lo, hi) for lo, hi in todo}
+            for fut in as_completed(futures):
+                lo, hi = futures[fut]
+                try:
+                    _lo, _hi, nxt = fut.result()
+                except BrokenProcessPool as e:
+                    print(f"Shard {lo}-{hi}: worker perdu ({e})")
+                    failed.append((lo, hi))
+                    continue
+                except Exception as e:
+                    print(f"Shard {lo}-{hi}: {e}")
+                    failed.append((lo, hi))
+                    continue
+                if nxt <= hi:
+                    print(f"Shard {lo}-{hi}: arrêté à {nxt}")
+                    failed.append((lo, hi))
+                else:
+                    print(f"Shard {lo}-{hi}: OK")
+        if not failed:
+            break
+        todo = sorted(failed)
+        print(f"Passe {attempt}: {len(todo)} shards incomplets")
+    else:
+        print("Backfill incomplet : relancer la même commande pour reprendre aux checkpoints.")
+        return False
+
+    by_date = merge_shards(directory, shards)
+    atom_price = hub.get_atom_price_usd()
+    # plages marquées faites (refusé si un autre run les a comptées entre-temps) avant de réécrire
+    # le CSV, le tout sous un seul verrou : un crash entre les deux laisse un trou signalé par
+    # --dates, jamais un double comptage, et aucun autre process ne réécrit le CSV entre-temps
+    with hub.state_lock():
+        hub.mark_done(ranges, exclusive=True)
+        df = hub.write_daily_csv(by_date, atom_price)
+    print(f"Fusion -> {hub.OUTFILE} ({len(by_date)} jours)")
+    print(df.tail(10).to_string(index=False))
+    return True
+
+
+# ------------------------------------------------------------
+# Gap repair (date range)
+# ------------------------------------------------------------
+#
+# A day is complete when the CSV tx_total equals the sum of num_txs of its blocks
+# (/blockchain metas, 20 heights per call, batched). Only the state file says which
+# heights a CSV row holds: a partly covered day is repaired only when its tx_total is
+# exactly the txs of the day's done heights, and then only the heights not done are
+# rescheduled. Any other row (older runs, windows the state doesn't record) is left
+# for manual review: guessing the covered heights from tx counts could sum them twice.
+
+def csv_tx_totals() -> dict:
+    if not os.path.exists(hub.OUTFILE):
+        return {}
+    df = pd.read_csv(hub.OUTFILE)
+    return {str(d): int(n) for d, n in zip(df["date"], df["tx_total"])}
+
+def dates_between(first: str, last: str) -> list:
+    d0 = datetime.strptime(first, "%Y-%m-%d").date()
+    d1 = datetime.strptime(last, "%Y-%m-%d").date()
+    return [str(d0 + timedelta(days=i)) for i in range((d1 - d0).days + 1)]
+
+def day_tx_counts(first: int, last: int) -> list:
+    """num_txs per height for first..last, from batched /blockchain calls."""
+    counts = []
+    height = first
+    while height <= last:
+        chunk = range(height, min(last, height + hub.ASYNC_BLOCK_BATCH - 1) + 1)
+        metas = hub.rpc_chunk_metas(chunk)
+        counts += [metas[h][1] for h in chunk]
+        height = chunk[-1] + 1
+    return counts
+
+def done_txs(first: int, counts: list, done) -> int:
+    """Txs of the heights first, first + 1, ... (counts) that `done` records as counted."""
+    return sum(n for h, n in enumerate(counts, first) if h in done)
+
+def missing_parts(first: int, counts: list, covered_txs: int, done):
+    """
+    [(lo, hi), ...] heights to rescan for a day whose CSV row holds covered_txs txs ([] if the
+    day is complete), or a str explaining why it can't be repaired automatically.
+    """
+    expected = sum(counts)
+    if covered_txs == expected:
+        return []
+    if covered_txs > expected:
+        return f"{covered_txs} tx dans le CSV pour {expected} attendues (double comptage ?)"
+    backed = done_txs(first, counts, done)
+    if covered_txs != backed:
+        return (f"{covered_txs} tx dans le CSV, {backed} sur les hauteurs faites de {hub.STATE_FILE} "
+                f"-> hauteurs couvertes inconnues")
+    return done.missing(first, first + len(counts) - 1)
+
+def unbacked_rows(ranges: list) -> list:
+    """
+    Dates touched by the height ranges whose CSV row holds txs the state file doesn't
+    account for: a backfill summed into them could count some heights twice.
+    """
+    totals = csv_tx_totals()
+    if not totals:
+        return []
+    st, _ = hub.rpc_status()
+    sync = st["result"]["sync_info"]
+    earliest = int(sync.get("earliest_block_height") or 1)
+    latest = int(sync["latest_block_height"])
+    state = hub.load_state()
+    done = state["done"] if state else HeightRanges()
+
+    index = HeightIndex(hub.rpc_block_metas)
+    dates = set()
+    try:
+        for lo, hi in ranges:
+            first_date = hub.date_from_unix(index.time_of(lo))
+            last_date = hub.date_from_unix(index.time_of(min(hi, latest)))
+            for date in dates_between(first_date, last_date):
+                covered = totals.get(date, 0)
+                if not covered:
+                    continue
+                first, last = index.day_range(date, earliest, latest)
+                if first is None:
+                    dates.add(date)
+                    continue
+                last = latest if last is None else last   # jour en cours
+                if done_txs(first, day_tx_counts(first, last), done) != covered:
+                    dates.add(date)
+    finally:
+        index.save()
+    return sorted(dates)
+
+def plan_repair(first_date: str, last_date: str) -> list:
+    """
+    Height ranges missing from OUTFILE for a date range: finished days only, never past the
+    cursor, and only for days whose CSV row the state file fully accounts for.
+    """
+    st, _ = hub.rpc_status()
+    sync = st["result"]["sync_info"]
+    earliest = int(sync.get("earliest_block_height") or 1)
+    latest = int(sync["latest_block_height"])
+    migrate_ledger()
+    state = hub.load_state()
+    cursor = state["last_height"] if state else None
+    done = state["done"] if state else HeightRanges()
+
+    index = HeightIndex(hub.rpc_block_metas)
+    totals = csv_tx_totals()
+    ranges = []
+    try:
+        for date in dates_between(first_date, last_date):
+            first, last = index.day_range(date, earliest, latest)
+            if first is None or last is None:
+                print(f"{date}: jour non terminé ou hors de l'historique du node -> ignoré")
+                continue
+            if cursor is not None and last > cursor:
+                print(f"{date}: au-delà du curseur ({cursor}) -> laissé au run quotidien")
+                continue
+            covered = totals.get(date, 0)
+            if not covered and not done.intersects(first, last):
+                missing = [(first, last)]   # ni ligne CSV ni hauteur faite : jour entier
+            else:
+                missing = missing_parts(first, day_tx_counts(first, last), covered, done)
+            if isinstance(missing, str):
+                print(f"{date}: {missing} -> à vérifier à la main")
+            elif not missing:
+                print(f"{date}: complet")
+            else:
+                print(f"{date}: à rescanner " + ", ".join(f"{lo} -> {hi}" for lo, hi in missing))
+                ranges += missing
+    finally:
+        index.save()
+    return ranges
+
+def repair(first_date: str, last_date: str, workers: int = BACKFILL_WORKERS) -> bool:
+    ranges = plan_repair(first_date, last_date)
+    if not ranges:
+        print("Rien à réparer.")
+        return True
+    # nom de run stable tant que rien n'est fusionné -> reprise possible aux checkpoints
+    digest = hashlib.sha1(json.dumps(ranges).encode()).hexdigest()[:10]
+    # plan_repair() n'a retenu que des jours dont le state explique la ligne CSV
+    return backfill(ranges, workers, name=f"repair_{first_date}_{last_date}_{digest}", check_csv=False)
+
+
+def main():
+    # python backfill.py START_HEIGHT END_HEIGHT [WORKERS]
+    # python backfill.py --dates 2026-01-01 2026-01-31 [WORKERS]   (seulement les hauteurs manquantes)
+    args = sys.argv[1:]
+    by_dates = args[:1] == ["--dates"]
+    if by_dates:
+        args = args[1:]
+    if len(args) < 2:
+        print("usage: python backfill.py START_HEIGHT END_HEIGHT [WORKERS]")
+        print("       python backfill.py --dates FIRST_DATE LAST_DATE [WORKERS]")
+        sys.exit(2)
+    workers = int(args[2]) if len(args) > 2 else BACKFILL_WORKERS
+    try:
+        if by_dates:
+            ok = repair(args[0], args[1], workers)
+        else:
+            start, end = int(args[0]), int(args[1])
+            ok = backfill([(start, end)], workers, name=f"{start}_{end}")
+    except RuntimeError as e:
+        print(e)
+        ok = False
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
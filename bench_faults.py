@@ -0,0 +1,172 @@
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import threading
+from datetime import datetime, timezone
+
+import standin_server
+from bench_scanner import run_scanner
+from standin_server import Faults, parse_fault
+from synth_chain import SyntheticChain
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+
+BENCH_OUT = "bench_faults.json"
+
+BLOCKS = 3_000
+MEAN_TXS = 5
+LATENCY = 0.01          # s ajoutées par requête HTTP par chaque stand-in
+ENDPOINTS = 2           # stand-ins servant la même chaîne (HUB_STANDIN_URL=url1,url2)
+SEED = 7
+
+# profil -> (pannes par endpoint, surcharges de hub_fee_monitor_v41)
+# syntaxe des pannes : standin_server.parse_fault ; "i@SPEC" = endpoint i seulement, sinon tous
+FAULT_PROFILES = {
+    "healthy": ([], []),
+    "throttled": (["429:rate=0.05,retry_after=1"], []),
+    "flaky_5xx": (["5xx:rate=0.05"], []),
+    "resets": (["reset:rate=0.02"], []),
+    "slow": (["slow:rate=0.02,seconds=3"], []),
+    "truncated": (["truncate:rate=0.02"], []),
+    "tx_not_indexed": (["tx404:seconds=2"], ['TX_FETCH_MODE="hash"']),
+    "outage_failover": (["0@reset:period=30,duty=0.5"], []),
+    "brownout_failover": (["0@slow:rate=0.5,seconds=8"], []),
+    "burst_429": (["429:period=20,duty=0.2,retry_after=2"], []),
+}
+
+
+# ------------------------------------------------------------
+# Profiles
+# ------------------------------------------------------------
+
+def endpoint_faults(specs: list, n_endpoints: int) -> list:
+    """One list of Fault per endpoint from 'SPEC' (all endpoints) / 'i@SPEC' (endpoint i) strings."""
+    out = [[] for _ in range(n_endpoints)]
+    for spec in specs:
+        target, sep, rest = spec.partition("@")
+        if sep and target.isdigit():
+            i = int(target)
+            if i >= n_endpoints:
+                raise ValueError(f"{spec}: endpoint {i} absent ({n_endpoints} endpoints)")
+            out[i].append(parse_fault(rest))
+        else:
+            for faults in out:
+                faults.append(parse_fault(spec))
+    return out
+
+def run_profile(name: str, specs: list, overrides: list, n_blocks: int, mean_txs: float,
+                latency: float, n_endpoints: int, seed: int) -> dict:
+    chain = SyntheticChain(n_blocks, mean_txs)
+    servers = []
+    for i, faults in enumerate(endpoint_faults(specs, n_endpoints)):
+        server = standin_server.serve(chain, port=0, throttle=standin_server.Throttle(latency),
+                                      faults=Faults(faults, seed + i))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    url = ",".join(f"http://127.0.0.1:{s.server_address[1]}" for s in servers)
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_faults_") as workdir:
+            result, cpu_s, _rss = run_scanner(url, n_blocks, workdir, overrides)
+    finally:
+        for s in servers:
+            s.shutdown()
+            s.server_close()
+
+    wall = result["wall_s"]
+    done = result["last_height"] or 0
+    injected = {}
+    for s in servers:
+        for kind, n in s.faults.snapshot().items():
+            injected[kind] = injected.get(kind, 0) + n
+    return {
+        "name": name,
+        "faults": specs,
+        "overrides": overrides,
+        "blocks": n_blocks,
+        "blocks_done": done,
+        "stopped_early": done < n_blocks,
+        "wall_s": round(wall, 3),
+        "blocks_per_min": round(done / wall * 60, 1) if wall else 0.0,
+        "http_requests": sum(s.stats.snapshot()["requests"] for s in servers),
+        "requests_by_endpoint": [s.stats.snapshot()["requests"] for s in servers],
+        "injected": injected,
+        "lcd_errors": result["lcd_errors"],
+        "cpu_s": round(cpu_s, 2),
+    }
+
+def print_table(report: dict):
+    cols = ["name", "blocks_done", "blocks_per_min", "wall_s", "http_requests", "stopped_early"]
+    rows = [[str(p[c]) for c in cols] + [" ".join(f"{k}={v}" for k, v in sorted(p["injected"].items()))]
+            for p in report["profiles"]]
+    cols.append("injected")
+    widths = [max(len(c), *(len(r[i]) for r in rows)) for i, c in enumerate(cols)]
+    print("  ".join(c.rjust(w) for c, w in zip(cols, widths)))
+    for r in rows:
+        print("  ".join(v.rjust(w) for v, w in zip(r, widths)))
+
+
+def main():
+    # python bench_faults.py                                 (tous les profils, 3 000 blocs, 2 endpoints)
+    # python bench_faults.py --profiles healthy outage_failover --blocks 10000
+    # python bench_faults.py --fault "0@5xx:rate=0.3" --fault "slow:prefix=/cosmos,seconds=2"   (profil "custom")
+    ap = argparse.ArgumentParser(description="Progression du scanner (blocs/min) sous pannes injectées dans le stand-in")
+    ap.add_argument("--profiles", nargs="+", default=None, choices=list(FAULT_PROFILES))
+    ap.add_argument("--fault", action="append", default=[], metavar="[i@]KIND[:key=value,...]",
+                    help="panne du profil \"custom\" (répétable), voir standin_server.parse_fault")
+    ap.add_argument("--blocks", type=int, default=BLOCKS)
+    ap.add_argument("--mean-txs", type=float, default=MEAN_TXS)
+    ap.add_argument("--latency", type=float, default=LATENCY)
+    ap.add_argument("--endpoints", type=int, default=ENDPOINTS)
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--set", action="append", default=[], metavar="NAME=JSON",
+                    help="surcharge d'une constante de hub_fee_monitor_v41, pour tous les profils (répétable)")
+    ap.add_argument("--out", default=BENCH_OUT)
+    args = ap.parse_args()
+
+    profiles = {}
+    if args.fault:
+        profiles["custom"] = (args.fault, [])
+    if args.profiles or not args.fault:
+        profiles.update((p, FAULT_PROFILES[p]) for p in (args.profiles or FAULT_PROFILES))
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "blocks": args.blocks,
+        "mean_txs_per_block": args.mean_txs,
+        "latency_s": args.latency,
+        "endpoints": args.endpoints,
+        "overrides": args.set,
+        "profiles": [],
+    }
+    failed = []
+    for name, (specs, overrides) in profiles.items():
+        print(f"{name} ...", flush=True)
+        try:
+            p = run_profile(name, specs, overrides + args.set, args.blocks, args.mean_txs,
+                            args.latency, args.endpoints, args.seed)
+        except Exception as e:
+            print(f"  échec: {e}")
+            failed.append(name)
+            continue
+        report["profiles"].append(p)
+        print(f"  {p['blocks_done']}/{p['blocks']} blocs en {p['wall_s']} s -> {p['blocks_per_min']} blocs/min"
+              f"{'  (STOP avant la fin)' if p['stopped_early'] else ''}")
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    if report["profiles"]:
+        print()
+        print_table(report)
+    print(f"\nRésultats -> {args.out}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
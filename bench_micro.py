@@ -0,0 +1,216 @@
+import argparse
+import base64
+import gc
+import json
+import os
+import platform
+import time
+from collections import deque
+from datetime import datetime, timezone
+from itertools import cycle, islice
+
+import numpy as np
+import pandas as pd
+
+import hub_fee_monitor_v41 as hub
+import inflation_overlay
+from synth_chain import SyntheticChain
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+
+BENCH_HISTORY = "bench_micro.json"   # un run ajouté à chaque exécution
+
+SIZES = [10, 1_000, 100_000, 10_000_000]
+REPEATS = 5                 # meilleur de N ; un seul passage au-delà de SINGLE_PASS_ITEMS
+SINGLE_PASS_ITEMS = 1_000_000
+POOL = 20_000               # entrées distinctes (txs, timestamps), parcourues en boucle
+POOL_BLOCKS = 4_000         # hauteurs de la chaîne synthétique dont on tire le pool
+NEW_DAYS = 2                # lignes du run courant fusionnées dans l'historique (veille + jour en cours)
+MAX_REAL_DAYS = 100_000     # au-delà, plus de vraie date (pandas s'arrête en 2262) : clé texte de même forme
+SEED = 42
+
+
+# ------------------------------------------------------------
+# Inputs
+# ------------------------------------------------------------
+
+def tx_pools(chain: SyntheticChain):
+    """(txs base64, LCD tx-by-hash responses, block times) drawn from the synthetic chain."""
+    txs_b64, lcd_txs, times = [], [], []
+    for h in range(1, POOL_BLOCKS + 1):
+        time_iso, txs = chain.block_txs(h)
+        times.append(time_iso)
+        for i, (raw, _tmpl) in enumerate(txs[:POOL - len(txs_b64)]):
+            txs_b64.append(base64.b64encode(raw).decode("ascii"))
+            lcd_txs.append(chain.tx_response(h, i))
+    return txs_b64, lcd_txs, times
+
+def day_keys(first_day: int, n_rows: int, real_dates: bool) -> list:
+    if real_dates:
+        return list(pd.date_range("1970-01-01", periods=n_rows, freq="D").shift(first_day).strftime("%Y-%m-%d"))
+    return [f"{d:010d}" for d in range(first_day, first_day + n_rows)]
+
+def daily_frame(n_rows: int, rng: np.random.Generator, first_day: int = 0, real_dates: bool = True) -> pd.DataFrame:
+    """hub_revenue_daily.csv as read back by write_daily_csv(), one row per day."""
+    tx_total = rng.integers(10_000, 60_000, n_rows)
+    tx_ibc = (tx_total * rng.uniform(0.2, 0.5, n_rows)).astype(np.int64)
+    total_fee = tx_total * rng.integers(2_000, 8_000, n_rows)
+    ibc_fee = (total_fee * rng.uniform(0.2, 0.6, n_rows)).astype(np.int64)
+    return pd.DataFrame({
+        "date": day_keys(first_day, n_rows, real_dates),
+        "tx_total": tx_total,
+        "tx_ibc": tx_ibc,
+        "tx_ibc_ratio_pct": tx_ibc / tx_total * 100.0,
+        "total_fee_uatom": total_fee,
+        "ibc_fee_uatom": ibc_fee,
+        "ibc_fee_share_pct": ibc_fee / total_fee * 100.0,
+        "lcd_errors": 0,
+    })
+
+def overlay_frame(n_rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Columns coverage_pct() reads in inflation_overlay.main(); early days lack a supply snapshot."""
+    supply = 390_000_000 + np.cumsum(rng.uniform(0, 60_000, n_rows))
+    supply[: n_rows // 3] = np.nan
+    df = pd.DataFrame({
+        "total_fee_atom": rng.uniform(50, 400, n_rows),
+        "ibc_fee_atom": rng.uniform(10, 200, n_rows),
+        "estimated_daily_emission_atom": supply * 0.1 / 365.0,
+    })
+    df["net_issuance_atom"] = pd.Series(supply).diff()
+    return df
+
+
+# ------------------------------------------------------------
+# Cases
+# ------------------------------------------------------------
+#
+# A case is (name, unit, setup(n) -> run) : setup builds the inputs outside the timing,
+# run() is what gets timed.
+
+def per_item(fn, pool):
+    def setup(n):
+        return lambda: deque(map(fn, islice(cycle(pool), n)), maxlen=0)
+    return setup
+
+def cases(chain: SyntheticChain) -> list:
+    txs_b64, lcd_txs, times = tx_pools(chain)
+    rng = np.random.default_rng(SEED)
+
+    def merge(n):
+        # le run courant recouvre le dernier jour de l'historique, comme un run quotidien
+        real = n + NEW_DAYS <= MAX_REAL_DAYS
+        old = daily_frame(n, rng, real_dates=real)
+        new = daily_frame(NEW_DAYS, rng, first_day=max(0, n - 1), real_dates=real)
+        return lambda: hub.merge_daily(old, new)
+
+    def coverage(n):
+        df = overlay_frame(n, rng)
+        def run():
+            for fee in ("total_fee_atom", "ibc_fee_atom"):
+                for base in ("estimated_daily_emission_atom", "net_issuance_atom"):
+                    inflation_overlay.coverage_pct(df[fee], df[base])
+        return run
+
+    return [
+        ("tm_tx_hash_from_b64", "txs", per_item(hub.tm_tx_hash_from_b64, txs_b64)),
+        ("normalize_iso", "timestamps", per_item(hub.normalize_iso, times)),
+        ("parse_date", "timestamps", per_item(hub.parse_date, times)),
+        ("fee_uatom_from_lcd_tx", "txs", per_item(hub.fee_uatom_from_lcd_tx, lcd_txs)),
+        ("is_ibc_tx", "txs", per_item(lambda t: hub.is_ibc_tx(hub.body_from_lcd_tx(t)), lcd_txs)),
+        ("merge_daily", "rows", merge),
+        ("coverage_pct", "rows", coverage),
+    ]
+
+def measure(setup, n: int) -> float:
+    """Best wall time (s) of run() over the repeats; GC off while timing."""
+    run = setup(n)
+    best = None
+    repeats = 1 if n >= SINGLE_PASS_ITEMS else REPEATS
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            run()
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+    finally:
+        gc.enable()
+    return best
+
+
+# ------------------------------------------------------------
+# Report
+# ------------------------------------------------------------
+
+def print_table(results: list, sizes: list):
+    """Time per case and size, with each case's share of the total at that size."""
+    totals = {n: sum(r["seconds"] for r in results if r["n"] == n) for n in sizes}
+    names = list(dict.fromkeys(r["name"] for r in results))
+    by_key = {(r["name"], r["n"]): r for r in results}
+    cols = ["case"] + [f"n={n:,}" for n in sizes]
+    rows = []
+    for name in names:
+        row = [name]
+        for n in sizes:
+            r = by_key.get((name, n))
+            share = r["seconds"] / totals[n] * 100 if r and totals[n] else 0.0
+            row.append(f"{r['seconds']:.4f} s ({share:.0f}%)" if r else "-")
+        rows.append(row)
+    widths = [max(len(c), *(len(r[i]) for r in rows)) for i, c in enumerate(cols)]
+    print("  ".join(c.rjust(w) for c, w in zip(cols, widths)))
+    for r in rows:
+        print("  ".join(v.rjust(w) for v, w in zip(r, widths)))
+
+
+def main():
+    # python bench_micro.py                               (10 -> 10M, toutes les fonctions)
+    # python bench_micro.py --sizes 10 1000 100000 --cases merge_daily coverage_pct
+    ap = argparse.ArgumentParser(description="Micro-benchmarks des fonctions chaudes du scanner et de la fusion CSV")
+    ap.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    ap.add_argument("--cases", nargs="+", default=None)
+    ap.add_argument("--history", default=BENCH_HISTORY)
+    ap.add_argument("--no-save", action="store_true")
+    args = ap.parse_args()
+
+    selected = cases(SyntheticChain(POOL_BLOCKS, seed=SEED))
+    if args.cases:
+        unknown = set(args.cases) - {name for name, _u, _s in selected}
+        if unknown:
+            ap.error(f"cas inconnus: {', '.join(sorted(unknown))}")
+        selected = [c for c in selected if c[0] in args.cases]
+
+    results = []
+    for n in args.sizes:
+        for name, unit, setup in selected:
+            seconds = measure(setup, n)
+            results.append({"name": name, "unit": unit, "n": n, "seconds": round(seconds, 6),
+                            "ns_per_item": round(seconds / n * 1e9, 1)})
+            print(f"{name:>22} n={n:<11,} {seconds:10.4f} s  {seconds / n * 1e9:12.1f} ns/{unit[:-1]}", flush=True)
+
+    print()
+    print_table(results, args.sizes)
+    if args.no_save:
+        return
+
+    history = []
+    if os.path.exists(args.history):
+        with open(args.history, encoding="utf-8") as f:
+            history = json.load(f)
+    history.append({
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "results": results,
+    })
+    with open(args.history, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=2)
+    print(f"\nRésultats ajoutés à {args.history} ({len(history)} runs)")
+
+
+if __name__ == "__main__":
+    main()
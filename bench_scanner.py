@@ -0,0 +1,247 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import standin_server
+from synth_chain import SyntheticChain
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+
+BENCH_OUT = "bench_scanner.json"
+BENCH_BASELINE = "bench_scanner_baseline.json"
+
+SIZES = [1_000, 10_000, 100_000]
+TX_PROFILES = {"sparse": 1, "busy": 20}    # txs moyens par bloc (synth_chain.SyntheticChain)
+LATENCY = 0.02                             # s ajoutées par requête HTTP par le stand-in
+
+# écart toléré vs baseline avant de signaler une régression (fraction)
+TOLERANCE = {
+    "blocks_per_s": 0.15,
+    "txs_per_s": 0.15,
+    "requests_per_block": 0.05,
+    "cpu_s": 0.20,
+    "peak_rss_mb": 0.20,
+}
+HIGHER_IS_BETTER = ("blocks_per_s", "txs_per_s")
+
+
+# ------------------------------------------------------------
+# Scanner run (child process)
+# ------------------------------------------------------------
+
+def scanner(overrides: list):
+    """hub_fee_monitor_v41 with the overrides applied and the disk cache off (imported in the child only)."""
+    import hub_fee_monitor_v41 as hub
+    hub.CHAIN_CACHE = False
+    for k, v in overrides:
+        setattr(hub, k, v)
+    return hub
+
+def scan(hub, end: int, by_date: dict, checkpoint) -> int:
+    if hub.ASYNC_SCAN:
+        return asyncio.run(hub.scan_range_async(1, end, by_date, checkpoint=checkpoint))
+    return hub.scan_range(1, end, by_date, checkpoint=checkpoint)
+
+def child(end: int, result_path: str, overrides: list):
+    """Runs in a fresh interpreter whose HUB_STANDIN_URL points at the bench server."""
+    hub = scanner(overrides)
+    by_date = {}
+    t0 = time.perf_counter()
+    last = scan(hub, end, by_date, lambda h: None)
+    wall = time.perf_counter() - t0
+
+    totals = {k: sum(v[k] for v in by_date.values()) for k in ("tx_total", "tx_ibc", "total_fee_uatom", "lcd_errors")}
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump({"wall_s": wall, "last_height": last, **totals}, f)
+
+def parse_overrides(specs: list) -> list:
+    out = []
+    for spec in specs:
+        k, v = spec.split("=", 1)
+        try:
+            v = json.loads(v)
+        except ValueError:
+            pass
+        out.append((k, v))
+    return out
+
+def run_scanner(url: str, end: int, workdir: str, specs: list, script: str = __file__, extra_args: list = ()):
+    """
+    (child result, cpu seconds, peak RSS MB) for one scan of 1..end; CPU/RSS include pool workers.
+    The child is `script --child END RESULT [--set SPEC ...] [extra_args]`, this file by default.
+    """
+    result_path = os.path.join(workdir, "result.json")
+    env = dict(os.environ, HUB_STANDIN_URL=url, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    cmd = [sys.executable, os.path.abspath(script), "--child", str(end), result_path]
+    for spec in specs:
+        cmd += ["--set", spec]
+    cmd += list(extra_args)
+    with open(os.path.join(workdir, "scan.log"), "wb") as log:
+        p = subprocess.Popen(cmd, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _pid, status, ru = os.wait4(p.pid, 0)
+        p.returncode = os.waitstatus_to_exitcode(status)
+    if p.returncode != 0 or not os.path.exists(result_path):
+        with open(os.path.join(workdir, "scan.log"), "rb") as f:
+            tail = f.read()[-2000:].decode("utf-8", "replace")
+        raise RuntimeError(f"scan en échec (code {p.returncode}):\n{tail}")
+    with open(result_path, encoding="utf-8") as f:
+        result = json.load(f)
+    rss_kb = ru.ru_maxrss / 1024 if sys.platform == "darwin" else ru.ru_maxrss
+    return result, ru.ru_utime + ru.ru_stime, rss_kb / 1024
+
+
+# ------------------------------------------------------------
+# Scenarios
+# ------------------------------------------------------------
+
+def scenario_name(n_blocks: int, profile: str) -> str:
+    size = f"{n_blocks // 1000}k" if n_blocks >= 1000 and n_blocks % 1000 == 0 else str(n_blocks)
+    return f"{size}_{profile}"
+
+def run_scenario(n_blocks: int, profile: str, latency: float, specs: list) -> dict:
+    chain = SyntheticChain(n_blocks, TX_PROFILES[profile])
+    server = standin_server.serve(chain, port=0, throttle=standin_server.Throttle(latency))
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_scanner_") as workdir:
+            result, cpu_s, rss_mb = run_scanner(url, n_blocks, workdir, specs)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    served = server.stats.snapshot()
+    expected = {k: sum(v[k] for v in chain.expected_by_date().values()) for k in ("tx_total", "tx_ibc", "total_fee_uatom")}
+    wall = result["wall_s"]
+    return {
+        "name": scenario_name(n_blocks, profile),
+        "blocks": n_blocks,
+        "mean_txs_per_block": TX_PROFILES[profile],
+        "latency_s": latency,
+        "txs": result["tx_total"],
+        "wall_s": round(wall, 3),
+        "blocks_per_s": round(n_blocks / wall, 1),
+        "txs_per_s": round(result["tx_total"] / wall, 1),
+        "http_requests": served["requests"],
+        "rpc_calls": served["calls"],
+        "requests_per_block": round(served["requests"] / n_blocks, 4),
+        "calls_per_block": round(served["calls"] / n_blocks, 4),
+        "bytes_per_block": round(served["bytes_out"] / n_blocks),
+        "cpu_s": round(cpu_s, 2),
+        "peak_rss_mb": round(rss_mb, 1),
+        "correct": (
+            result["last_height"] == n_blocks and result["lcd_errors"] == 0
+            and all(result[k] == v for k, v in expected.items())
+        ),
+    }
+
+
+# ------------------------------------------------------------
+# Baseline comparison
+# ------------------------------------------------------------
+
+def compare(report: dict, baseline: dict) -> list:
+    """Regression messages: metrics worse than the baseline by more than TOLERANCE."""
+    base = {s["name"]: s for s in baseline.get("scenarios", [])}
+    out = []
+    for s in report["scenarios"]:
+        b = base.get(s["name"])
+        if b is None:
+            continue
+        for metric, tol in TOLERANCE.items():
+            old, new = b.get(metric), s.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > tol:
+                out.append(f"{s['name']}: {metric} {old} -> {new} ({change:+.1%}, tolérance {tol:.0%})")
+    return out
+
+def print_table(report: dict):
+    cols = ["name", "blocks_per_s", "txs_per_s", "requests_per_block", "calls_per_block", "cpu_s", "peak_rss_mb", "correct"]
+    rows = [[str(s[c]) for c in cols] for s in report["scenarios"]]
+    widths = [max(len(c), *(len(r[i]) for r in rows)) for i, c in enumerate(cols)]
+    print("  ".join(c.rjust(w) for c, w in zip(cols, widths)))
+    for r in rows:
+        print("  ".join(v.rjust(w) for v, w in zip(r, widths)))
+
+
+def main():
+    # python bench_scanner.py                       (1k/10k/100k blocs x sparse/busy, 20 ms de latence)
+    # python bench_scanner.py --sizes 1000 10000 --latency 0.05 --set TX_FETCH_MODE='"block"'
+    # python bench_scanner.py --save-baseline       (puis les runs suivants comparent à la baseline)
+    ap = argparse.ArgumentParser(description="Benchmark de bout en bout du scanner contre une chaîne locale")
+    ap.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    ap.add_argument("--profiles", nargs="+", default=list(TX_PROFILES), choices=list(TX_PROFILES))
+    ap.add_argument("--latency", type=float, default=LATENCY)
+    ap.add_argument("--set", action="append", default=[], metavar="NAME=JSON",
+                    help="surcharge d'une constante de hub_fee_monitor_v41 (répétable)")
+    ap.add_argument("--out", default=BENCH_OUT)
+    ap.add_argument("--baseline", default=BENCH_BASELINE)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--child", nargs=2, metavar=("END", "RESULT"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        child(int(args.child[0]), args.child[1], parse_overrides(args.set))
+        return
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "overrides": args.set,
+        "scenarios": [],
+    }
+    for n_blocks in args.sizes:
+        for profile in args.profiles:
+            name = scenario_name(n_blocks, profile)
+            print(f"{name} ...", flush=True)
+            s = run_scenario(n_blocks, profile, args.latency, args.set)
+            report["scenarios"].append(s)
+            print(f"  {s['blocks_per_s']} blocs/s, {s['txs_per_s']} tx/s, {s['requests_per_block']} req/bloc, "
+                  f"{s['cpu_s']} s CPU, {s['peak_rss_mb']} Mo RSS{'' if s['correct'] else '  <- AGRÉGATS FAUX'}")
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print()
+    print_table(report)
+    print(f"\nRésultats -> {args.out}")
+
+    failed = [s["name"] for s in report["scenarios"] if not s["correct"]]
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline -> {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline)
+        if baseline.get("overrides", []) != args.set:
+            print(f"\nBaseline mesurée avec d'autres surcharges ({baseline.get('overrides')}) : comparaison ignorée")
+        elif regressions:
+            print("\nRégressions vs baseline :")
+            for r in regressions:
+                print("  " + r)
+            failed += regressions
+        else:
+            print(f"Aucune régression vs {args.baseline}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import os
+import threading
+import zlib
+
+import fast_json
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+
+CACHE_DIR = "chain_cache"
+CACHE_MAX_BYTES = 2 * 1024 ** 3     # au-delà, éviction LRU jusqu'à CACHE_LOW_WATER
+CACHE_LOW_WATER = 0.9
+COMPRESS_LEVEL = 6
+
+
+# ------------------------------------------------------------
+# Disk cache for immutable chain data
+# ------------------------------------------------------------
+#
+# One zlib-compressed JSON file per entry: <CACHE_DIR>/<kind>/<shard>/<key>.json.z
+# (kind = "block", "tx", "lcdblock"; key = height or tx hash). Only committed data is
+# stored, so entries never need invalidation. Files are written to a temp name and
+# renamed, so several processes (backfill workers) can share the directory.
+# A hit touches the file's mtime; eviction removes the oldest mtimes first.
+
+class DiskCache:
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.total = None   # octets sur disque, calculé au premier put
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, kind: str, key) -> str:
+        key = str(key)
+        shard = str(int(key) // 10000) if key.isdigit() else key[:2]
+        return os.path.join(self.root, kind, shard, key + ".json.z")
+
+    def get(self, kind: str, key):
+        p = self.path(kind, key)
+        try:
+            with open(p, "rb") as f:
+                data = f.read()
+            obj = fast_json.loads(zlib.decompress(data))
+        except (OSError, zlib.error, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(p)
+        except OSError:
+            pass
+        with self.lock:
+            self.hits += 1
+        return obj
+
+    def put(self, kind: str, key, obj):
+        p = self.path(kind, key)
+        data = zlib.compress(fast_json.dumps(obj), COMPRESS_LEVEL)
+        tmp = f"{p}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(p), exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, p)
+        except OSError as e:
+            print(f"Cache disque: écriture impossible ({p}): {e}")
+            return
+        with self.lock:
+            if self.total is None:
+                self.total = self.disk_usage()
+            else:
+                self.total += len(data)
+            over = self.total > self.max_bytes
+        if over:
+            self.evict()
+
+    def files(self):
+        for dirpath, _dirs, names in os.walk(self.root):
+            for name in names:
+                if name.endswith(".json.z"):
+                    p = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(p)
+                    except OSError:
+                        continue
+                    yield st.st_mtime, st.st_size, p
+
+    def disk_usage(self) -> int:
+        return sum(size for _mtime, size, _p in self.files())
+
+    def evict(self):
+        """Remove least recently used entries until the cache is back under CACHE_LOW_WATER."""
+        with self.lock:
+            entries = sorted(self.files())
+            total = sum(size for _mtime, size, _p in entries)
+            target = self.max_bytes * CACHE_LOW_WATER
+            for _mtime, size, p in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(p)
+                except OSError:
+                    continue
+                total -= size
+            self.total = total
+
+
+cache = DiskCache()
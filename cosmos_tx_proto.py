@@ -0,0 +1,182 @@
+import base64
+import hashlib
+from array import array
+
+# ------------------------------------------------------------
+# Minimal protobuf wire-format reader for Cosmos SDK txs
+# ------------------------------------------------------------
+#
+# TxRaw     : 1 body_bytes, 2 auth_info_bytes, 3 signatures
+# TxBody    : 1 messages (repeated Any)
+# Any       : 1 type_url, 2 value
+# AuthInfo  : 1 signer_infos, 2 fee
+# Fee       : 1 amount (repeated Coin), 2 gas_limit, 3 payer, 4 granter
+# Coin      : 1 denom, 2 amount (decimal string)
+#
+# Only the fields above are read; everything else is skipped without copying.
+
+WT_VARINT = 0
+WT_I64 = 1
+WT_LEN = 2
+WT_I32 = 5
+
+FEE_DENOM = b"uatom"
+IBC_PREFIX = b"/ibc."
+
+
+def read_varint(buf, pos: int):
+    result = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+        if shift >= 64:
+            raise ValueError("varint trop long")
+
+def iter_fields(buf):
+    """
+    Lazily yield (field_number, wire_type, value) over a memoryview.
+    Length-delimited values are zero-copy memoryview slices.
+    """
+    pos = 0
+    n = len(buf)
+    while pos < n:
+        key, pos = read_varint(buf, pos)
+        field, wt = key >> 3, key & 7
+        if wt == WT_VARINT:
+            val, pos = read_varint(buf, pos)
+        elif wt == WT_LEN:
+            size, pos = read_varint(buf, pos)
+            end = pos + size
+            if end > n:
+                raise ValueError("champ tronqué")
+            val = buf[pos:end]
+            pos = end
+        elif wt == WT_I64:
+            val = buf[pos:pos + 8]
+            pos += 8
+        elif wt == WT_I32:
+            val = buf[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"wire type non supporté: {wt}")
+        if pos > n:
+            raise ValueError("champ tronqué")
+        yield field, wt, val
+
+def _len_fields(buf, wanted: int):
+    for field, wt, val in iter_fields(buf):
+        if field == wanted and wt == WT_LEN:
+            yield val
+
+
+# ------------------------------------------------------------
+# Extractors (raw bytes)
+# ------------------------------------------------------------
+
+def split_tx_raw(raw):
+    """Return (body_bytes, auth_info_bytes) memoryviews of a TxRaw."""
+    mv = raw if isinstance(raw, memoryview) else memoryview(raw)
+    body = auth = None
+    for field, wt, val in iter_fields(mv):
+        if wt != WT_LEN:
+            continue
+        if field == 1:
+            body = val
+        elif field == 2:
+            auth = val
+    if body is None or auth is None:
+        raise ValueError("TxRaw sans body ou auth_info")
+    return body, auth
+
+def fee_amount_from_auth_info(auth_info, denom: bytes = FEE_DENOM) -> int:
+    total = 0
+    for fee in _len_fields(auth_info, 2):
+        for coin in _len_fields(fee, 1):
+            coin_denom = amount = None
+            for field, wt, val in iter_fields(coin):
+                if wt != WT_LEN:
+                    continue
+                if field == 1:
+                    coin_denom = val
+                elif field == 2:
+                    amount = val
+            if coin_denom == denom and amount is not None:
+                total += int(bytes(amount))
+    return total
+
+def msg_type_urls_from_body(body) -> list:
+    urls = []
+    for msg in _len_fields(body, 1):
+        for type_url in _len_fields(msg, 1):
+            urls.append(bytes(type_url).decode("utf-8"))
+    return urls
+
+def body_has_ibc_msg(body) -> bool:
+    for msg in _len_fields(body, 1):
+        for type_url in _len_fields(msg, 1):
+            if type_url[:len(IBC_PREFIX)] == IBC_PREFIX:
+                return True
+    return False
+
+def decode_tx_summary(raw) -> tuple:
+    """
+    (fee_uatom, is_ibc) straight from TxRaw bytes, same values as
+    fee_uatom_from_lcd_tx() / is_ibc_tx() on the LCD-decoded tx.
+    """
+    body, auth = split_tx_raw(raw)
+    return fee_amount_from_auth_info(auth), body_has_ibc_msg(body)
+
+def decode_tx_summary_b64(tx_b64: str) -> tuple:
+    return decode_tx_summary(base64.b64decode(tx_b64))
+
+
+# ------------------------------------------------------------
+# Batch decoding (process pool workers)
+# ------------------------------------------------------------
+#
+# A batch travels as one blob of newline-separated base64 txs (base64 never contains
+# b"\n") and comes back as flat buffers, so a pool round trip pickles a few bytes
+# objects whatever the number of txs.
+
+TX_OK = 0
+TX_IBC = 1
+TX_UNDECODABLE = 2
+
+def pack_b64_batch(txs_b64) -> bytes:
+    return b"\n".join(x if isinstance(x, bytes) else x.encode("ascii") for x in txs_b64)
+
+def decode_b64_batch(blob: bytes) -> tuple:
+    """
+    (fees, flags) for a packed batch: fees is array("q").tobytes(), flags one byte per tx
+    (TX_OK, TX_IBC or TX_UNDECODABLE, whose fee is 0).
+    """
+    fees = array("q")
+    flags = bytearray()
+    for tx_b64 in blob.split(b"\n"):
+        try:
+            fee, ibc = decode_tx_summary(base64.b64decode(tx_b64))
+        except Exception:
+            fees.append(0)
+            flags.append(TX_UNDECODABLE)
+            continue
+        fees.append(fee)
+        flags.append(TX_IBC if ibc else TX_OK)
+    return fees.tobytes(), bytes(flags)
+
+def unpack_summaries(fees: bytes, flags: bytes) -> list:
+    """[(fee_uatom, is_ibc) or None if undecodable, ...] from decode_b64_batch() buffers."""
+    fee_values = array("q")
+    fee_values.frombytes(fees)
+    return [None if f == TX_UNDECODABLE else (fee, f == TX_IBC) for fee, f in zip(fee_values, flags)]
+
+def hash_b64_batch(blob: bytes) -> bytes:
+    """Concatenated 32-byte SHA256 digests (Tendermint tx hashes) of a packed batch."""
+    return b"".join(hashlib.sha256(base64.b64decode(x)).digest() for x in blob.split(b"\n"))
+
+def unpack_hashes(digests: bytes) -> list:
+    return [digests[i:i + 32].hex().upper() for i in range(0, len(digests), 32)]
@@ -0,0 +1,132 @@
+import json
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+
+# au-delà, les réponses /block ne sont pas parsées en entier : on extrait header + data.txs
+SLIM_MIN_BYTES = 256 * 1024
+
+
+# ------------------------------------------------------------
+# Full decoding / encoding
+# ------------------------------------------------------------
+
+def loads(data):
+    """json.loads(), through orjson when installed (bytes or str)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(obj) -> bytes:
+    """Compact UTF-8 JSON, through orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+# ------------------------------------------------------------
+# Targeted extraction from raw /block bodies
+# ------------------------------------------------------------
+#
+# A CometBFT block is serialized as {"header":{...},"data":{"txs":[...]},"evidence":...,"last_commit":...}.
+# The scanner only reads header.height, header.time and data.txs (base64 strings, never escaped,
+# returned as bytes) and skips the signatures / evidence without building them.
+# Anything unexpected raises ValueError so the caller can fall back to a full parse.
+
+_ITEM_RE = re.compile(rb'"id":\s*(-?\d+)\s*,\s*"(result|error)"\s*:')
+
+def _string_after(buf: bytes, key: bytes, start: int, end: int):
+    i = buf.find(key, start, end)
+    if i < 0:
+        raise ValueError(f"{key.decode()} introuvable")
+    i = buf.index(b'"', i + len(key), end) + 1
+    j = buf.index(b'"', i, end)
+    return buf[i:j].decode("ascii"), j + 1
+
+def slim_block(buf: bytes, start: int = 0):
+    """
+    ({"header": {"height", "time"}, "data": {"txs": [...]}}, position after data.txs)
+    for the first block found in buf[start:].
+    """
+    end = len(buf)
+    h = buf.find(b'"header":', start, end)
+    if h < 0:
+        raise ValueError("header introuvable")
+    height, pos = _string_after(buf, b'"height":', h, end)
+    time_iso, pos = _string_after(buf, b'"time":', pos, end)
+
+    d = buf.find(b'"data":', pos, end)
+    t = buf.find(b'"txs":', d, end) if d >= 0 else -1
+    if t < 0:
+        raise ValueError("data.txs introuvable")
+    i = t + len(b'"txs":')
+    while buf[i:i + 1] in (b" ", b"\n", b"\r", b"\t"):
+        i += 1
+    if buf.startswith(b"null", i):
+        txs = []
+        j = i + 4
+    elif buf[i:i + 1] == b"[":
+        j = buf.index(b"]", i, end)
+        if buf.find(b"\\", i, j) >= 0:
+            raise ValueError("tx échappée")
+        # une seule copie par tx (bytes base64, acceptés tels quels par base64.b64decode)
+        txs = []
+        k = i + 1
+        while True:
+            q = buf.find(b'"', k, j)
+            if q < 0:
+                break
+            r = buf.index(b'"', q + 1, j)
+            txs.append(buf[q + 1:r])
+            k = r + 1
+        j += 1
+    else:
+        raise ValueError("data.txs invalide")
+    return {"header": {"height": height, "time": time_iso}, "data": {"txs": txs}}, j
+
+def decode_block_response(body: bytes):
+    """/block response; bodies above SLIM_MIN_BYTES only keep what the scanner reads."""
+    if len(body) < SLIM_MIN_BYTES:
+        return loads(body)
+    try:
+        if b'"error"' in body[:200]:
+            return loads(body)
+        block, _ = slim_block(body)
+        return {"result": {"block": block}}
+    except ValueError:
+        return loads(body)
+
+def decode_block_batch(body: bytes):
+    """
+    JSON-RPC batch of "block" calls, same shape as loads() but each result
+    slimmed like decode_block_response(). Items are found by their "id" key,
+    searching again only after the txs of the previous block.
+    """
+    if len(body) < SLIM_MIN_BYTES:
+        return loads(body)
+    out = []
+    pos = 0
+    try:
+        while True:
+            m = _ITEM_RE.search(body, pos)
+            if m is None:
+                break
+            rid = int(m.group(1))
+            if m.group(2) == b"error":
+                msg, pos = _string_after(body, b'"message":', m.end(), len(body))
+                out.append({"id": rid, "error": msg})
+            else:
+                block, pos = slim_block(body, m.end())
+                out.append({"id": rid, "result": {"block": block}})
+    except ValueError:
+        return loads(body)
+    if not out:
+        return loads(body)
+    return out
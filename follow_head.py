@@ -0,0 +1,214 @@
+import json
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+try:
+    import websocket   # websocket-client
+except ImportError:
+    websocket = None
+
+import fast_json
+import http_client
+import hub_fee_monitor_v41 as hub
+from height_ranges import HeightRanges
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+
+NEWBLOCK_QUERY = "tm.event='NewBlock'"
+WS_PATH = "/websocket"
+WS_TIMEOUT = 30              # sans événement pendant ce délai -> on considère la connexion morte
+WS_RECONNECT_DELAY = 5
+
+POLL_INTERVAL = 6            # ~1 bloc Hub ; utilisé sans websocket ou après une déconnexion
+FLUSH_SECONDS = 60           # state + réécriture du CSV (ligne du jour mise à jour en place)
+PRICE_REFRESH_SECONDS = 3600
+
+
+# ------------------------------------------------------------
+# Websocket NewBlock
+# ------------------------------------------------------------
+
+def ws_url(rpc_base: str) -> str:
+    parts = urlsplit(rpc_base)
+    scheme = "wss" if parts.scheme == "https" else "ws"
+    return urlunsplit((scheme, parts.netloc, parts.path.rstrip("/") + WS_PATH, "", ""))
+
+def block_from_event(msg: dict):
+    """The block of a NewBlock event message, or None for the subscription ack / other messages."""
+    if msg.get("error"):
+        raise RuntimeError(f"websocket: {msg['error']}")
+    data = (msg.get("result") or {}).get("data") or {}
+    return (data.get("value") or {}).get("block")
+
+def iter_new_blocks(rpc_base: str):
+    """Yield each committed block (the /block `result.block` shape) pushed by one RPC node."""
+    ws = websocket.create_connection(ws_url(rpc_base), timeout=WS_TIMEOUT)
+    try:
+        ws.send(json.dumps({
+            "jsonrpc": "2.0", "id": 1, "method": "subscribe",
+            "params": {"query": NEWBLOCK_QUERY},
+        }))
+        while True:
+            raw = ws.recv()
+            if not raw:
+                raise ConnectionError("websocket fermé par le nœud")
+            block = block_from_event(fast_json.loads(raw))
+            if block is not None:
+                yield block
+    finally:
+        ws.close()
+
+
+# ------------------------------------------------------------
+# Follower
+# ------------------------------------------------------------
+
+class HeadFollower:
+    """
+    Keeps the current day's aggregate up to date as blocks commit.
+
+    Blocks are applied strictly in height order with the batch code paths
+    (parse_date, block_tx_summaries, commit_chunk). Any gap — missed events,
+    a reconnect, a failed lookup — is filled by polling from the last committed height,
+    skipping heights the state file already records as done.
+    Every FLUSH_SECONDS the state is saved, then the pending aggregate is merged into OUTFILE.
+    """
+
+    def __init__(self):
+        self.by_date = {}
+        self.last = None
+        self.saved = None   # dernière hauteur enregistrée dans le state
+        self.atom_price = None
+        self.price_at = 0.0
+        self.flushed_at = time.monotonic()
+
+    def start(self):
+        state = hub.load_state()
+        if state and state.get("last_height") is not None:
+            self.last = int(state["last_height"])
+        else:
+            st, _ = hub.rpc_status()
+            self.last = int(st["result"]["sync_info"]["latest_block_height"]) - 1
+        self.saved = self.last
+        print(f"Suivi de la tête à partir du bloc {self.last + 1}")
+
+    # --- ingestion ---
+
+    def apply(self, height: int, outcome) -> bool:
+        last, stopped = hub.commit_chunk(range(height, height + 1), [outcome], self.by_date)
+        if last is not None:
+            self.last = last
+        return not stopped
+
+    def on_block(self, block: dict) -> bool:
+        """Apply a pushed block; False if the caller must resync by polling."""
+        height = int(block["header"]["height"])
+        if height <= self.last:
+            return True
+        if height > self.last + 1:
+            print(f"Trou {self.last + 1} -> {height - 1} : rattrapage par polling")
+            if not self.catch_up(height - 1):
+                return False
+        date = hub.parse_date(block["header"]["time"])
+        txs_b64 = block["data"].get("txs", []) or []
+        return self.apply(height, hub.block_outcome(height, (date, txs_b64)))
+
+    def catch_up(self, end=None) -> bool:
+        """Poll blocks last+1..end (default: current head). False if it stopped early."""
+        if end is None:
+            st, _ = hub.rpc_status()
+            end = int(st["result"]["sync_info"]["latest_block_height"])
+        # comme scan_range(), mais le state n'avance qu'au flush, avec le CSV
+        state = hub.load_state()
+        done = state["done"] if state else HeightRanges()
+        height = self.last + 1
+        while height <= end:
+            if height in done:
+                # déjà compté par un autre process (run quotidien, backfill) : on saute la plage
+                self.last = done.watermark(floor=height)
+                height = self.last + 1
+                continue
+            chunk = hub.next_chunk(height, end)
+            chunk = range(chunk[0], done.missing(chunk[0], chunk[-1])[0][1] + 1)
+            blocks = hub.fetch_chunk(chunk)
+            height = chunk[-1] + 1
+            outcomes = (hub.block_outcome(h, blocks[h]) for h in chunk)
+            last, stopped = hub.commit_chunk(chunk, outcomes, self.by_date)
+            if last is not None:
+                self.last = last
+            self.maybe_flush()
+            if stopped:
+                return False
+        return True
+
+    # --- output ---
+
+    def maybe_flush(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self.flushed_at < FLUSH_SECONDS:
+            return
+        self.flushed_at = now
+        if not self.by_date:
+            return
+        if self.atom_price is None or now - self.price_at >= PRICE_REFRESH_SECONDS:
+            self.atom_price = hub.get_atom_price_usd()
+            self.price_at = now
+        # state puis CSV, sous un seul verrou (comme la fusion des backfills) : un crash entre
+        # les deux laisse un trou pour backfill --dates, jamais un double comptage au redémarrage
+        with hub.state_lock():
+            if self.last > self.saved:
+                hub.save_state(self.last, first=self.saved + 1)
+                self.saved = self.last
+            hub.write_daily_csv(self.by_date, self.atom_price)
+        days = ", ".join(f"{d}: {v['tx_total']} tx" for d, v in sorted(self.by_date.items()))
+        print(f"Flush -> {hub.OUTFILE} (bloc {self.last}; {days})")
+        self.by_date = {}
+
+    # --- boucles ---
+
+    def follow_ws(self, rpc_base: str):
+        for block in iter_new_blocks(rpc_base):
+            if not self.on_block(block):
+                raise RuntimeError(f"bloc incomplet après {self.last}")
+            self.maybe_flush()
+
+    def run(self):
+        self.start()
+        try:
+            while True:
+                try:
+                    self.catch_up()
+                except Exception as e:
+                    print(f"Rattrapage par polling en échec: {e}")
+                if websocket is None:
+                    time.sleep(POLL_INTERVAL)
+                    continue
+                for base in http_client.router.order(hub.RPCS):
+                    try:
+                        print(f"Abonnement NewBlock: {ws_url(base)}")
+                        self.follow_ws(base)
+                    except Exception as e:
+                        print(f"Websocket {base} interrompu -> polling: {e}")
+                    try:
+                        self.catch_up()
+                    except Exception as e:
+                        print(f"Rattrapage par polling en échec: {e}")
+                time.sleep(WS_RECONNECT_DELAY)
+        finally:
+            self.maybe_flush(force=True)
+
+
+def main():
+    # python follow_head.py   (Ctrl-C pour arrêter ; les blocs en attente sont écrits)
+    if websocket is None:
+        print("websocket-client absent : suivi par polling uniquement")
+    try:
+        HeadFollower().run()
+    except KeyboardInterrupt:
+        print("\nArrêt.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import json
+import os
+import sys
+from bisect import bisect_left
+from datetime import datetime, timezone, timedelta
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+
+INDEX_FILE = "height_index.json"
+METAS_PER_CALL = 20   # /blockchain renvoie au plus 20 block metas par appel
+
+
+# ------------------------------------------------------------
+# Persistent (height, block time) index
+# ------------------------------------------------------------
+
+def day_start_unix(date: str) -> int:
+    d = datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    return int(d.timestamp())
+
+class HeightIndex:
+    """
+    Sorted (height, unix block time) checkpoints, persisted in INDEX_FILE.
+
+    `fetch_metas(min_height, max_height)` must return [(height, unix_time, num_txs), ...]
+    for at most METAS_PER_CALL heights (the /blockchain RPC route).
+    Day boundaries are found by a safeguarded interpolation search over heights,
+    so each lookup costs O(log n) /blockchain calls, and fewer once checkpoints accumulate.
+    """
+
+    def __init__(self, fetch_metas, path: str = INDEX_FILE):
+        self.fetch_metas = fetch_metas
+        self.path = path
+        self.heights = []
+        self.times = []
+        self.days = {}   # date -> [first_height, last_height] (jours terminés uniquement)
+        self.calls = 0
+        self.load()
+
+    # --- persistence ---
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                j = json.load(f)
+            pairs = sorted(zip(j.get("heights", []), j.get("times", [])))
+            self.heights = [int(h) for h, _ in pairs]
+            self.times = [int(t) for _, t in pairs]
+            self.days = j.get("days", {}) or {}
+        except Exception:
+            self.heights, self.times, self.days = [], [], {}
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"heights": self.heights, "times": self.times, "days": self.days}, f)
+        os.replace(tmp, self.path)
+
+    # --- checkpoints ---
+
+    def add(self, height: int, unix_time: int):
+        i = bisect_left(self.heights, height)
+        if i < len(self.heights) and self.heights[i] == height:
+            return
+        self.heights.insert(i, height)
+        self.times.insert(i, unix_time)
+
+    def add_metas(self, metas):
+        # seules les extrémités d'une fenêtre servent de bornes à la recherche
+        if metas:
+            self.add(metas[0][0], metas[0][1])
+            self.add(metas[-1][0], metas[-1][1])
+
+    def metas(self, lo: int, hi: int):
+        self.calls += 1
+        metas = sorted(self.fetch_metas(lo, hi))
+        if not metas:
+            raise RuntimeError(f"/blockchain vide pour {lo}-{hi}")
+        self.add_metas(metas)
+        return metas
+
+    def time_of(self, height: int) -> int:
+        i = bisect_left(self.heights, height)
+        if i < len(self.heights) and self.heights[i] == height:
+            return self.times[i]
+        return self.metas(height, height)[0][1]
+
+    # --- search ---
+
+    def first_height_at_or_after(self, t: int, earliest: int, latest: int):
+        """First height whose block time is >= t, or None if no block that recent exists yet."""
+        if self.time_of(latest) < t:
+            return None
+
+        # bornes initiales : checkpoints connus qui encadrent t
+        lo, hi = earliest, latest
+        i = bisect_left(self.times, t)
+        if i > 0 and self.heights[i - 1] >= lo:
+            lo = self.heights[i - 1]
+        if i < len(self.heights) and self.heights[i] <= hi:
+            hi = self.heights[i]
+        if self.time_of(lo) >= t:
+            return lo
+        t_lo, t_hi = self.time_of(lo), self.time_of(hi)
+
+        # invariant : time(lo) < t <= time(hi)
+        bisect_next = False
+        while hi - lo > 1:
+            if hi - lo <= METAS_PER_CALL:
+                for h, ts, _n in self.metas(lo + 1, hi - 1):
+                    if ts >= t:
+                        return h
+                return hi
+
+            # interpolation (temps de bloc ~constant) ; si un pas ne divise pas
+            # l'intervalle par 2, le suivant est une bissection -> pire cas en O(log n)
+            span = hi - lo
+            if bisect_next:
+                guess = lo + span // 2 - METAS_PER_CALL // 2
+            else:
+                guess = lo + int(span * (t - t_lo) / max(1, t_hi - t_lo)) - METAS_PER_CALL // 2
+            guess = max(lo + 1, min(guess, hi - METAS_PER_CALL))
+            window = self.metas(guess, guess + METAS_PER_CALL - 1)
+            first_h, first_t = window[0][0], window[0][1]
+            last_h, last_t = window[-1][0], window[-1][1]
+            if last_t < t:
+                lo, t_lo = last_h, last_t
+            elif first_t >= t:
+                hi, t_hi = first_h, first_t
+            else:
+                for h, ts, _n in window:
+                    if ts >= t:
+                        return h
+            bisect_next = (hi - lo) * 2 > span
+        return hi
+
+    def day_range(self, date: str, earliest: int, latest: int):
+        """
+        (first_height, last_height) of a UTC date. last_height is None while the day
+        is still in progress; (None, None) if the day hasn't started yet or is pruned.
+        """
+        if date in self.days:
+            first, last = self.days[date]
+            return int(first), int(last)
+
+        t0 = day_start_unix(date)
+        first = self.first_height_at_or_after(t0, earliest, latest)
+        if first is None:
+            return None, None
+        next_first = self.first_height_at_or_after(t0 + 86400, earliest, latest)
+        last = next_first - 1 if next_first is not None else None
+        if last is not None and last < first:
+            return None, None
+
+        if last is not None and first > earliest:
+            self.days[date] = [first, last]
+        return first, last
+
+
+def main():
+    # python height_index.py 2026-02-20 [2026-02-21 ...]
+    import hub_fee_monitor_v41 as hub
+
+    st, _ = hub.rpc_status()
+    sync = st["result"]["sync_info"]
+    earliest = int(sync.get("earliest_block_height") or 1)
+    latest = int(sync["latest_block_height"])
+
+    index = HeightIndex(hub.rpc_block_metas)
+    dates = sys.argv[1:] or [str((datetime.now(timezone.utc) - timedelta(days=1)).date())]
+    for date in dates:
+        first, last = index.day_range(date, earliest, latest)
+        print(f"{date}: {first} -> {last}")
+    index.save()
+    print(f"Appels /blockchain: {index.calls} (checkpoints: {len(index.heights)})")
+
+
+if __name__ == "__main__":
+    main()
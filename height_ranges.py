@@ -0,0 +1,86 @@
+from bisect import bisect_left, bisect_right
+
+
+# ------------------------------------------------------------
+# Interval set of completed heights
+# ------------------------------------------------------------
+
+class HeightRanges:
+    """
+    Completed heights as sorted, disjoint, non-adjacent inclusive ranges [lo, hi].
+
+    Adding a range merges it with every range it overlaps or touches, so a scan that
+    finishes chunks out of order leaves a few ranges while it runs and a single one
+    once the holes are filled: the size follows the number of holes, not of heights.
+    """
+
+    def __init__(self, ranges=()):
+        self.starts = []
+        self.ends = []
+        for lo, hi in ranges:
+            self.add(int(lo), int(hi))
+
+    def add(self, lo: int, hi: int = None):
+        hi = lo if hi is None else hi
+        if hi < lo:
+            raise ValueError(f"plage vide: {lo}-{hi}")
+        # plages qui chevauchent ou touchent [lo, hi] : indices i..j-1
+        i = bisect_left(self.ends, lo - 1)
+        j = bisect_right(self.starts, hi + 1)
+        if i < j:
+            lo = min(lo, self.starts[i])
+            hi = max(hi, self.ends[j - 1])
+        self.starts[i:j] = [lo]
+        self.ends[i:j] = [hi]
+
+    def __contains__(self, height: int) -> bool:
+        i = bisect_right(self.starts, height) - 1
+        return i >= 0 and self.ends[i] >= height
+
+    def intersects(self, lo: int, hi: int) -> bool:
+        """True if any height of lo..hi is done."""
+        i = bisect_left(self.ends, lo)
+        return i < len(self.starts) and self.starts[i] <= hi
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def count(self) -> int:
+        """Number of completed heights."""
+        return sum(hi - lo + 1 for lo, hi in zip(self.starts, self.ends))
+
+    def highest(self):
+        """Highest completed height, None when nothing is done."""
+        return self.ends[-1] if self.ends else None
+
+    def watermark(self, floor: int = None):
+        """
+        Highest height h such that every height from the lowest completed one (or from
+        `floor`) up to h is done. None when nothing is done; floor - 1 if floor itself isn't.
+        """
+        if floor is None:
+            return self.ends[0] if self.ends else None
+        i = bisect_right(self.starts, floor) - 1
+        if i >= 0 and self.ends[i] >= floor:
+            return self.ends[i]
+        return floor - 1
+
+    def missing(self, lo: int, hi: int) -> list:
+        """[(a, b), ...] heights of lo..hi not done yet, in order."""
+        gaps = []
+        i = max(0, bisect_right(self.starts, lo) - 1)
+        cursor = lo
+        while cursor <= hi and i < len(self.starts):
+            if self.ends[i] < cursor:
+                i += 1
+                continue
+            if self.starts[i] > cursor:
+                gaps.append((cursor, min(hi, self.starts[i] - 1)))
+            cursor = self.ends[i] + 1
+            i += 1
+        if cursor <= hi:
+            gaps.append((cursor, hi))
+        return gaps
+
+    def ranges(self) -> list:
+        return [[lo, hi] for lo, hi in zip(self.starts, self.ends)]
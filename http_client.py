@@ -0,0 +1,520 @@
+import atexit
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+
+POOL_CONNECTIONS = 16    # nombre d'hôtes dont le pool de connexions est conservé
+POOL_MAXSIZE = 8         # connexions keep-alive max par hôte (= requêtes simultanées max par hôte)
+POOL_BLOCK = True        # au-delà de POOL_MAXSIZE, on attend une connexion libre au lieu d'en ouvrir une
+
+# Routage : EWMA latence / taux d'erreur par endpoint, persistés entre les runs
+ROUTER_STATS_FILE = "endpoint_stats.json"
+EWMA_ALPHA = 0.2             # poids de la dernière mesure
+MIN_LATENCY = 0.01           # plancher (s) pour ne pas donner un poids infini
+UNHEALTHY_ERROR_RATE = 0.5   # au-delà, l'endpoint n'est plus choisi qu'en dernier recours
+UNHEALTHY_WEIGHT = 0.01
+
+# Circuit breaker par endpoint : closed -> open (quarantaine) -> half-open (1 sonde) -> closed
+BREAKER_FAILURES = 3         # échecs consécutifs avant ouverture
+BREAKER_COOLDOWN = 30.0      # s de quarantaine à la 1re ouverture
+BREAKER_MAX_COOLDOWN = 600.0 # la quarantaine double à chaque sonde ratée, jusqu'à ce plafond
+
+# Token bucket adaptatif par endpoint (AIMD) : +RATE_INCREASE req/s par seconde sans refus,
+# x RATE_DECREASE sur 429/503, pause complète pendant un éventuel Retry-After
+RATE_INITIAL = 10.0          # req/s au démarrage
+RATE_MIN = 0.5
+RATE_MAX = 200.0
+RATE_INCREASE = 2.0
+RATE_DECREASE = 0.5
+RATE_BURST = 10              # jetons accumulables
+THROTTLE_STATUSES = (429, 503)
+
+# Hedging : doublon vers un 2e endpoint si pas de réponse après le p95 observé
+LATENCY_SAMPLES = 200        # dernières latences gardées par endpoint pour le p95
+HEDGE_MIN_SAMPLES = 20       # pas de hedge tant que le p95 n'est pas significatif
+HEDGE_BUDGET_RATIO = 0.05    # au plus ~5% de requêtes en plus
+HEDGE_BUDGET_BURST = 10
+HEDGE_POOL_SIZE = 32
+
+BODY_CHUNK = 64 * 1024       # lecture du corps par morceaux quand une deadline est imposée
+
+# Serveur local de remplacement (standin_server.py) : si la variable est définie, toutes les
+# URLs (RPC, LCD, CoinGecko) de tous les scripts pointent vers lui.
+# ex: HUB_STANDIN_URL=http://127.0.0.1:8765 python run_criteria1_pipeline.py
+# Plusieurs serveurs séparés par des virgules = plusieurs endpoints RPC/LCD (failover testable).
+STANDIN_URLS = [u.strip().rstrip("/") for u in os.environ.get("HUB_STANDIN_URL", "").split(",") if u.strip()]
+STANDIN_URL = STANDIN_URLS[0] if STANDIN_URLS else ""
+
+DEFAULT_HEADERS = {
+    "Accept-Encoding": "gzip, deflate",
+    "Accept": "application/json",
+    "Connection": "keep-alive",
+    "User-Agent": "cosmos-hub-monitor",
+}
+
+
+# ------------------------------------------------------------
+# Endpoints
+# ------------------------------------------------------------
+
+def endpoints(urls: list) -> list:
+    """The configured RPC/LCD base URLs, or only the stand-in server(s) when HUB_STANDIN_URL is set."""
+    return list(STANDIN_URLS) if STANDIN_URLS else list(urls)
+
+def service_url(url: str) -> str:
+    """A third-party URL (price API), rewritten to the stand-in server with the same path."""
+    if not STANDIN_URL:
+        return url
+    parts = urlsplit(url)
+    return STANDIN_URL + parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+# ------------------------------------------------------------
+# Shared session
+# ------------------------------------------------------------
+#
+# One requests.Session per process: urllib3 keeps a pool of keep-alive
+# connections per (scheme, host, port), so successive calls to the same
+# RPC/LCD node reuse the TCP+TLS connection instead of reopening it.
+
+_session = None
+_session_lock = threading.Lock()
+
+def _new_session() -> requests.Session:
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, pool_block=POOL_BLOCK)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers.update(DEFAULT_HEADERS)
+    return s
+
+def session() -> requests.Session:
+    global _session
+    s = _session
+    if s is None:
+        with _session_lock:
+            if _session is None:
+                _session = _new_session()
+            s = _session
+    return s
+
+def configure(pool_connections=None, pool_maxsize=None, pool_block=None):
+    """Change the pool sizes; the next request builds a fresh session with them."""
+    global POOL_CONNECTIONS, POOL_MAXSIZE, POOL_BLOCK
+    if pool_connections is not None:
+        POOL_CONNECTIONS = pool_connections
+    if pool_maxsize is not None:
+        POOL_MAXSIZE = pool_maxsize
+    if pool_block is not None:
+        POOL_BLOCK = pool_block
+    close()
+
+def close():
+    global _session
+    with _session_lock:
+        s, _session = _session, None
+    if s is not None:
+        s.close()
+
+
+# ------------------------------------------------------------
+# Latency-aware endpoint routing
+# ------------------------------------------------------------
+
+class EndpointRouter:
+    """
+    Per-endpoint EWMA of latency and error rate, persisted in `path`.
+
+    order() returns the endpoints as a weighted random permutation
+    (weight = health / latency): the first entry is the one to use, the rest is
+    the failover order. Fast healthy nodes get most of the traffic but load still
+    spreads over every endpoint, and a node that starts failing drops to the back.
+    """
+
+    def __init__(self, path: str = ROUTER_STATS_FILE):
+        self.path = path
+        self.stats = {}
+        self.samples = {}   # endpoint -> deque des dernières latences OK (non persisté)
+        self.lock = threading.Lock()
+        self.loaded = False
+
+    def load(self):
+        self.loaded = True
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.stats = json.load(f)
+        except Exception:
+            self.stats = {}
+
+    def save(self):
+        if not self.stats:
+            return
+        with self.lock:
+            data = json.dumps(self.stats, indent=1, sort_keys=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+    def record(self, endpoint: str, elapsed: float, ok: bool):
+        with self.lock:
+            if not self.loaded:
+                self.load()
+            st = self.stats.get(endpoint)
+            if st is None:
+                st = self.stats[endpoint] = {"latency": elapsed, "error_rate": 0.0 if ok else 1.0, "n": 0}
+            else:
+                if ok:
+                    st["latency"] += EWMA_ALPHA * (elapsed - st["latency"])
+                st["error_rate"] += EWMA_ALPHA * ((0.0 if ok else 1.0) - st["error_rate"])
+            st["n"] += 1
+            if ok:
+                self.samples.setdefault(endpoint, deque(maxlen=LATENCY_SAMPLES)).append(elapsed)
+
+    def p95(self, endpoint: str):
+        """p95 of the recent successful latencies, None until HEDGE_MIN_SAMPLES are known."""
+        with self.lock:
+            samples = sorted(self.samples.get(endpoint, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+    def weight(self, endpoint: str, default_latency: float) -> float:
+        st = self.stats.get(endpoint)
+        if st is None:
+            # endpoint jamais mesuré : aussi attractif que le meilleur connu, pour l'explorer
+            return 1.0 / max(MIN_LATENCY, default_latency)
+        health = 1.0 - st["error_rate"]
+        if st["error_rate"] > UNHEALTHY_ERROR_RATE:
+            health *= UNHEALTHY_WEIGHT
+        return max(health, 1e-6) / max(MIN_LATENCY, st["latency"])
+
+    def order(self, endpoints) -> list:
+        with self.lock:
+            if not self.loaded:
+                self.load()
+            known = [self.stats[e]["latency"] for e in endpoints if e in self.stats]
+            default_latency = min(known) if known else 1.0
+            weights = {e: self.weight(e, default_latency) for e in endpoints}
+        # tirage pondéré sans remise (Efraimidis-Spirakis)
+        keyed = [(random.random() ** (1.0 / weights[e]), e) for e in endpoints]
+        return [e for _k, e in sorted(keyed, reverse=True)]
+
+router = EndpointRouter()
+atexit.register(router.save)
+
+
+# ------------------------------------------------------------
+# Circuit breakers
+# ------------------------------------------------------------
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+class CircuitBreaker:
+    """
+    closed: requests pass, consecutive failures are counted.
+    open: requests fail fast with CircuitOpenError until the cool-down is over.
+    half-open: a single probe request passes; success closes, failure reopens
+    with a doubled cool-down.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.state = self.CLOSED
+        self.failures = 0
+        self.cooldown = BREAKER_COOLDOWN
+        self.opened_at = 0.0
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def before_request(self):
+        with self.lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN:
+                remaining = self.cooldown - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(f"circuit ouvert pour {self.endpoint} (encore {remaining:.0f}s)")
+                self.state = self.HALF_OPEN
+                self.probing = False
+            if self.probing:
+                raise CircuitOpenError(f"circuit half-open pour {self.endpoint} (sonde en cours)")
+            self.probing = True
+
+    def on_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.cooldown = BREAKER_COOLDOWN
+            self.probing = False
+
+    def release(self):
+        """The request ended without a verdict on the node's health (throttled): free the probe slot."""
+        with self.lock:
+            self.probing = False
+
+    def on_failure(self):
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self._open(min(BREAKER_MAX_COOLDOWN, self.cooldown * 2))
+                return
+            self.failures += 1
+            if self.state == self.CLOSED and self.failures >= BREAKER_FAILURES:
+                self._open(BREAKER_COOLDOWN)
+
+    def _open(self, cooldown: float):
+        self.state = self.OPEN
+        self.cooldown = cooldown
+        self.opened_at = time.monotonic()
+        self.probing = False
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def breaker(endpoint: str) -> CircuitBreaker:
+    with _breakers_lock:
+        br = _breakers.get(endpoint)
+        if br is None:
+            br = _breakers[endpoint] = CircuitBreaker(endpoint)
+    return br
+
+
+# ------------------------------------------------------------
+# Adaptive rate limiting
+# ------------------------------------------------------------
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket whose rate follows AIMD: each accepted request adds
+    RATE_INCREASE / rate (so about +RATE_INCREASE req/s per second of clean
+    traffic), a 429/503 multiplies the rate by RATE_DECREASE (at most once per
+    second) and Retry-After pauses the bucket entirely.
+    """
+
+    def __init__(self, rate: float = RATE_INITIAL, burst: int = RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        """Take one token, sleeping (outside the lock) until it is due; DeadlineExceeded if too late."""
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.paused_until)
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # réservation : les jetons peuvent devenir négatifs, chacun attend son tour
+            self.tokens -= 1.0
+            wait = (start - now) + (max(0.0, -self.tokens) / self.rate)
+            if deadline is not None and now + wait > deadline:
+                self.tokens += 1.0
+                raise DeadlineExceeded(f"jeton disponible dans {wait:.1f}s, après la deadline")
+        if wait > 0:
+            time.sleep(wait)
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(RATE_MAX, self.rate + RATE_INCREASE / self.rate)
+
+    def on_throttle(self, retry_after=None):
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_decrease >= 1.0:
+                self.rate = max(RATE_MIN, self.rate * RATE_DECREASE)
+                self.last_decrease = now
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+
+def parse_retry_after(value):
+    """Retry-After in seconds (delta-seconds or HTTP date), None if absent or unreadable."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def bucket(endpoint: str) -> AdaptiveTokenBucket:
+    with _buckets_lock:
+        b = _buckets.get(endpoint)
+        if b is None:
+            b = _buckets[endpoint] = AdaptiveTokenBucket()
+    return b
+
+
+# ------------------------------------------------------------
+# Hedged calls
+# ------------------------------------------------------------
+
+class HedgeBudget:
+    """Each call earns `ratio` of a token, each hedge spends one: hedges stay below ratio x traffic."""
+
+    def __init__(self, ratio: float = HEDGE_BUDGET_RATIO, burst: float = HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+        self.fired = 0
+        self.won = 0
+        self.lock = threading.Lock()
+
+    def earn(self):
+        with self.lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def spend(self) -> bool:
+        with self.lock:
+            if self.tokens < 1.0:
+                return False
+            self.tokens -= 1.0
+            self.fired += 1
+            return True
+
+hedge_budget = HedgeBudget()
+_hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_POOL_SIZE, thread_name_prefix="hedge")
+
+_NO_HEDGE = object()
+
+def hedged(primary, backup, delay: float):
+    """
+    Run primary() in the caller's thread; if it hasn't answered `delay` seconds after it
+    started and the hedge budget allows it, also run backup() on the hedge pool. The
+    primary's success is returned as soon as it arrives (a backup not started yet is
+    cancelled, an in-flight one's answer is dropped); if the primary fails, the backup's
+    answer is used when one was fired.
+    """
+    hedge_budget.earn()
+    finished = threading.Event()
+    start = time.monotonic()
+
+    def hedge():
+        # délai compté depuis le départ du primaire, pas depuis la mise en file de cette tâche
+        if finished.wait(max(0.0, start + delay - time.monotonic())) or not hedge_budget.spend():
+            return _NO_HEDGE
+        return backup()
+
+    second = _hedge_pool.submit(hedge)
+    try:
+        result = primary()
+    except Exception as e:
+        finished.set()
+        if second.cancel():
+            raise
+        try:
+            result = second.result()
+        except Exception:
+            raise e
+        if result is _NO_HEDGE:
+            raise
+        with hedge_budget.lock:
+            hedge_budget.won += 1
+        return result
+    finished.set()
+    second.cancel()
+    return result
+
+
+# ------------------------------------------------------------
+# Requests
+# ------------------------------------------------------------
+
+def _read_body(r, deadline: float):
+    """Read the body in chunks so the whole transfer, not each socket read, respects the deadline."""
+    chunks = []
+    try:
+        for chunk in r.iter_content(BODY_CHUNK):
+            chunks.append(chunk)
+            if time.monotonic() > deadline:
+                raise DeadlineExceeded(f"corps de réponse incomplet à la deadline ({r.url})")
+    except Exception:
+        r.close()
+        raise
+    r._content = b"".join(chunks)
+
+def _request(method, url, deadline, kwargs):
+    if deadline is not None:
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise DeadlineExceeded(f"deadline dépassée avant {url}")
+        kwargs["timeout"] = min(kwargs.get("timeout") or left, left)
+        kwargs["stream"] = True
+    r = session().request(method, url, **kwargs)
+    if deadline is not None:
+        _read_body(r, deadline)
+    return r
+
+def _send(method, url, endpoint, deadline=None, **kwargs):
+    if endpoint is None:
+        return _request(method, url, deadline, kwargs)
+    br = breaker(endpoint)
+    tb = bucket(endpoint)
+    # jeton d'abord : un DeadlineExceeded ici ne doit pas laisser une sonde half-open en suspens
+    tb.acquire(deadline)
+    br.before_request()   # CircuitOpenError si l'endpoint est en quarantaine
+    t0 = time.monotonic()
+    try:
+        r = _request(method, url, deadline, kwargs)
+    except Exception:
+        router.record(endpoint, time.monotonic() - t0, ok=False)
+        br.on_failure()
+        raise
+    # 4xx (ex: tx pas encore indexée) ne dit rien de la santé du node, sauf 429
+    ok = r.status_code < 500 and r.status_code != 429
+    router.record(endpoint, time.monotonic() - t0, ok=ok)
+    retry_after = parse_retry_after(r.headers.get("Retry-After"))
+    # 429, ou 503 avec Retry-After : le node demande de ralentir, pas de le mettre en quarantaine
+    throttled = r.status_code == 429 or (r.status_code == 503 and retry_after is not None)
+    if throttled:
+        br.release()
+    elif ok:
+        br.on_success()
+    else:
+        br.on_failure()
+    if r.status_code in THROTTLE_STATUSES:
+        tb.on_throttle(retry_after)
+    elif ok:
+        tb.on_success()
+    return r
+
+def get(url, params=None, timeout=None, headers=None, endpoint=None, deadline=None):
+    """
+    GET through the shared session. `endpoint` (base URL) enables the router stats,
+    circuit breaker and rate limiter; `deadline` (time.monotonic()) bounds the whole call.
+    """
+    return _send("GET", url, endpoint, deadline, params=params, timeout=timeout, headers=headers)
+
+def post(url, json_body=None, timeout=None, headers=None, endpoint=None, deadline=None):
+    return _send("POST", url, endpoint, deadline, json=json_body, timeout=timeout, headers=headers)
@@ -1,29 +1,50 @@
-import requests
 import json
 import os
 import time
 import pandas as pd
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 import re
 import hashlib
 import base64
+import asyncio
+import threading
+import multiprocessing
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit
+
+import http_client
+import fast_json
+from chain_cache import cache as chain_cache
+import cosmos_tx_proto
+from cosmos_tx_proto import decode_tx_summary
+from height_index import HeightIndex, METAS_PER_CALL
+from height_ranges import HeightRanges
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
 
 # ------------------------------------------------------------
 # CONFIG
 # ------------------------------------------------------------
 
-RPCS = [
+RPCS = http_client.endpoints([
     "https://cosmos-rpc.polkachu.com:443",
     "https://rpc.cosmoshub.strange.love:443",
     "https://rpc-cosmoshub.blockapsis.com:443",
     "https://rpc.cosmos.network",
-]
+])
 
-LCDS = [
+LCDS = http_client.endpoints([
     "https://cosmos-api.polkachu.com",
     "https://cosmoshub-lcd.publicnode.com",
     "https://api.cosmos.network",
-]
+])
 
 STATE_FILE = "state_fee_v41.json"
 OUTFILE = "hub_revenue_daily.csv"
@@ -35,62 +56,230 @@ REQ_TIMEOUT = 25
 MAX_RETRIES = 3
 BACKOFF = 0.8
 
-SLEEP_BETWEEN_BLOCKS = 0.05
-SLEEP_BETWEEN_TXS = 0.02
+# Budgets de temps : partagés entre retries et failover, le timeout de chaque tentative
+# se réduit à ce qu'il reste
+FETCH_DEADLINE = 60.0         # un fetch logique (toutes tentatives, tous endpoints)
+BLOCK_DEADLINE = 120.0        # récupération d'un chunk de blocs, puis lookups LCD d'un bloc
+MIN_ATTEMPT_TIMEOUT = 1.0     # on ne lance pas de tentative avec moins que ça
+
+# Politesse : plus de sleep fixe, chaque endpoint a un token bucket adaptatif
+# (429/503 + Retry-After) dans http_client, voir RATE_INITIAL / RATE_MAX.
+
+# Mode asyncio : plusieurs blocs (et leurs tx) en vol en même temps
+ASYNC_SCAN = True
+ASYNC_BLOCK_BATCH = 15000     # ~1 journée de blocs Hub par run
+SCAN_CONCURRENCY = 16         # requêtes /block (ou batchs de blocs) en vol simultanément
+SCAN_MAX_BUFFERED_BLOCKS = 3000   # blocs lancés mais pas encore comptés (en vol + terminés hors ordre) :
+                                  # borne la mémoire quand un chunk lent retient tous ceux qui le suivent
+
+# Étage CPU du scan async : décodage protobuf (mode local) ou hash (mode hash) des txs
+# d'un chunk entier, envoyé en un seul blob à un process pool
+DECODE_WORKERS = os.cpu_count() or 1   # 1 = pas de pool, tout inline
+DECODE_POOL_MIN_TXS = 200              # en dessous, inline : l'aller-retour IPC coûte plus cher
+# workers lancés sans fork : le scan tourne avec des threads (HTTP, LCD) dont un fork copierait les verrous
+DECODE_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+# requêtes HTTP simultanées max par hôte : taille des pools keep-alive (http_client.POOL_MAXSIZE)
+
+# Récupération des tx :
+# "local" = décodage protobuf des data.txs du bloc, 0 appel LCD (fallback "block")
+# "block" = 1 appel LCD paginé par bloc (GetBlockWithTxs) (fallback "hash")
+# "hash"  = 1 appel LCD par tx
+TX_FETCH_MODE = "local"
+TXS_BLOCK_PAGE_LIMIT = 100
+
+# Requêtes LCD "hedgées" : doublon vers un 2e LCD au-delà du p95 observé (budget dans http_client)
+HEDGE_LCD = True
+
+# JSON-RPC batch (POST) : plusieurs appels "block" par requête, taille adaptative
+RPC_BATCH = True
+RPC_BATCH_START = 20
+RPC_BATCH_MIN = 2
+RPC_BATCH_MAX = 100
+RPC_BATCH_TARGET_SECONDS = 5.0   # au-delà, on réduit la taille du batch
+RPC_BATCH_MAX_FAILURES = 3       # échecs consécutifs avant de repasser en GET unitaire
+
+# /blockchain donne num_txs + heure pour 20 hauteurs : les blocs vides ne sont pas téléchargés
+SKIP_EMPTY_BLOCKS = True
+
+# Cache disque (chain_cache.py) des blocs et txs déjà vus : un re-scan ne touche plus le réseau
+CHAIN_CACHE = True
 
 
 # ------------------------------------------------------------
 # HTTP helpers
 # ------------------------------------------------------------
 
-def request_with_retries(url, params=None, timeout=REQ_TIMEOUT):
+def deadline_in(seconds: float) -> float:
+    return time.monotonic() + seconds
+
+def request_with_retries(url, params=None, timeout=REQ_TIMEOUT, json_body=None, endpoint=None, deadline=None):
     last_err = None
     for i in range(1, MAX_RETRIES + 1):
+        if deadline is not None:
+            left = deadline - time.monotonic()
+            if left < MIN_ATTEMPT_TIMEOUT:
+                break
+            attempt_timeout = min(timeout, left)
+        else:
+            attempt_timeout = timeout
         try:
-            r = requests.get(url, params=params, timeout=timeout)
+            if json_body is None:
+                r = http_client.get(url, params=params, timeout=attempt_timeout, endpoint=endpoint, deadline=deadline)
+            else:
+                r = http_client.post(url, json_body=json_body, timeout=attempt_timeout, endpoint=endpoint, deadline=deadline)
             r.raise_for_status()
             return r
+        except (http_client.CircuitOpenError, http_client.DeadlineExceeded):
+            # endpoint en quarantaine / budget épuisé : ni retry ni backoff
+            raise
         except Exception as e:
             last_err = e
-            time.sleep(BACKOFF * i)
-    raise last_err
+            if i == MAX_RETRIES:
+                break
+            pause = BACKOFF * i
+            if deadline is not None and time.monotonic() + pause + MIN_ATTEMPT_TIMEOUT > deadline:
+                break
+            time.sleep(pause)
+    raise last_err or http_client.DeadlineExceeded(f"budget épuisé avant {url}")
+
+def http_get_any(base_urls, path, params=None, timeout=REQ_TIMEOUT, json_body=None, deadline=None, decode=None):
+    # ordre pondéré par latence / santé observées (http_client.router)
+    return http_get_ordered(http_client.router.order(base_urls), path, params, timeout, json_body, deadline, decode)
 
-def http_get_any(base_urls, path, params=None, timeout=REQ_TIMEOUT):
+def http_get_ordered(bases, path, params=None, timeout=REQ_TIMEOUT, json_body=None, deadline=None, decode=None):
+    """
+    Try `bases` in order; the retries and the failover share one deadline (FETCH_DEADLINE by default).
+    `decode(body_bytes)` replaces the full JSON parse (fast_json.loads).
+    """
+    if deadline is None:
+        deadline = deadline_in(FETCH_DEADLINE)
     errors = []
-    for base in base_urls:
+    for base in bases:
+        if deadline - time.monotonic() < MIN_ATTEMPT_TIMEOUT:
+            errors.append(("*", "budget de temps épuisé"))
+            break
         url = base.rstrip("/") + path
         try:
-            r = request_with_retries(url, params=params, timeout=timeout)
-            return r.json(), base
+            r = request_with_retries(url, params=params, timeout=timeout, json_body=json_body, endpoint=base, deadline=deadline)
+            return (decode or fast_json.loads)(r.content), base
         except Exception as e:
             errors.append((base, str(e)))
             continue
     raise RuntimeError("Tous les endpoints ont échoué:\n" + "\n".join([f"- {b}: {err}" for b, err in errors]))
 
+def http_get_hedged(base_urls, path, params=None, timeout=REQ_TIMEOUT, deadline=None):
+    """
+    http_get_any(), plus a duplicate sent to the next endpoint when the first one
+    hasn't answered within its observed p95 latency (see http_client.hedged).
+    Both legs share the same deadline.
+    """
+    if deadline is None:
+        deadline = deadline_in(FETCH_DEADLINE)
+    order = http_client.router.order(base_urls)
+    delay = http_client.router.p95(order[0]) if HEDGE_LCD and len(order) > 1 else None
+    if delay is None:
+        return http_get_ordered(order, path, params, timeout, deadline=deadline)
+    return http_client.hedged(
+        lambda: http_get_ordered(order, path, params, timeout, deadline=deadline),
+        lambda: http_get_ordered(order[1:] + order[:1], path, params, timeout, deadline=deadline),
+        delay,
+    )
+
 def get_atom_price_usd():
-    url = "https://api.coingecko.com/api/v3/simple/price"
+    url = http_client.service_url("https://api.coingecko.com/api/v3/simple/price")
     params = {"ids": "cosmos", "vs_currencies": "usd"}
-    r = requests.get(url, params=params, timeout=20)
+    r = http_client.get(url, params=params, timeout=20)
     r.raise_for_status()
-    return float(r.json()["cosmos"]["usd"])
+    return float(fast_json.loads(r.content)["cosmos"]["usd"])
 
 
 # ------------------------------------------------------------
 # State
 # ------------------------------------------------------------
 
+# STATE_FILE : {"done": [[lo, hi], ...] hauteurs terminées, "last_height": plus haute hauteur faite}
+# (un ancien state {"last_height": h} se relit comme [[h, h]])
+# "last_height" est le curseur du run quotidien et du suivi de tête : toujours côté tête de chaîne,
+# un backfill plus bas ne le fait pas reculer. Les trous sous le curseur restent à backfill --dates.
+# Écrit par le run quotidien, le suivi de tête et la fusion des backfills : toute écriture
+# relit le fichier sous un verrou fichier (STATE_FILE.lock), commun à tous les process.
+# Le même verrou couvre la fusion dans OUTFILE : hauteurs marquées faites puis CSV réécrit,
+# sans qu'un autre process ne relise le CSV entre les deux.
+
+_state_lock = threading.RLock()
+_state_lock_depth = 0   # sections imbriquées du thread qui tient _state_lock
+
+@contextmanager
+def state_lock():
+    """Exclusive access to STATE_FILE and OUTFILE across threads and processes (reentrant)."""
+    global _state_lock_depth
+    with _state_lock:
+        if _state_lock_depth:
+            _state_lock_depth += 1
+            try:
+                yield
+            finally:
+                _state_lock_depth -= 1
+            return
+        with open(STATE_FILE + ".lock", "a+") as f:
+            _lock_file(f)
+            _state_lock_depth = 1
+            try:
+                yield
+            finally:
+                _state_lock_depth = 0
+                _unlock_file(f)
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
 def load_state():
+    """{"last_height": highest done height or None, "done": HeightRanges}, or None without a state file."""
     if not os.path.exists(STATE_FILE):
         return None
     try:
         with open(STATE_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+            j = json.load(f)
+        done = HeightRanges(j.get("done") or [])
+        if not done and j.get("last_height") is not None:
+            done.add(int(j["last_height"]))
     except Exception:
         return None
+    return {"last_height": done.highest(), "done": done}
+
+def mark_done(ranges: list, exclusive: bool = False):
+    """
+    Merge [(lo, hi), ...] into the completed heights of STATE_FILE. With `exclusive`, raise
+    RuntimeError without writing anything if one of them is already partly done.
+    """
+    with state_lock():
+        state = load_state()
+        done = state["done"] if state else HeightRanges()
+        if exclusive:
+            clash = [(lo, hi) for lo, hi in ranges if done.intersects(lo, hi)]
+            if clash:
+                raise RuntimeError(f"hauteurs déjà comptées dans {STATE_FILE}: {clash}")
+        for lo, hi in ranges:
+            done.add(lo, hi)
+        tmp = f"{STATE_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"last_height": done.highest(), "done": done.ranges()}, f)
+        os.replace(tmp, STATE_FILE)
 
-def save_state(height: int):
-    with open(STATE_FILE, "w", encoding="utf-8") as f:
-        json.dump({"last_height": height}, f)
+def save_state(height: int, first: int = None):
+    """Mark first..height (default: height alone) as done, merged with the ranges already saved."""
+    mark_done([(height if first is None else first, height)])
 
 
 # ------------------------------------------------------------
@@ -115,6 +304,13 @@ def parse_date(block_time_iso: str) -> str:
     dt = datetime.fromisoformat(ts).astimezone(timezone.utc)
     return str(dt.date())
 
+def block_unix_time(block_time_iso: str) -> int:
+    ts = normalize_iso(block_time_iso)
+    return int(datetime.fromisoformat(ts).timestamp())
+
+def date_from_unix(unix_time: int) -> str:
+    return str(datetime.fromtimestamp(unix_time, timezone.utc).date())
+
 
 # ------------------------------------------------------------
 # RPC calls
@@ -124,10 +320,231 @@ def rpc_status():
     j, base = http_get_any(RPCS, "/status")
     return j, base
 
-def rpc_block(height: int):
-    j, base = http_get_any(RPCS, f"/block?height={height}")
+def rpc_block(height: int, deadline=None):
+    j = cached_block(height)
+    if j is not None:
+        return j, "cache"
+    # grosses réponses : seuls header.time et data.txs sont extraits (fast_json)
+    j, base = http_get_any(RPCS, f"/block?height={height}", deadline=deadline, decode=fast_json.decode_block_response)
+    cache_block(height, j)
     return j, base
 
+def metas_from_blockchain(j: dict):
+    metas = j["result"].get("block_metas", []) or []
+    return sorted(
+        (int(m["header"]["height"]), block_unix_time(m["header"]["time"]), int(m.get("num_txs", 0) or 0))
+        for m in metas
+    )
+
+def rpc_block_metas(min_height: int, max_height: int, deadline=None):
+    """[(height, unix_time, num_txs), ...] ascending, from /blockchain (20 metas max per call)."""
+    params = {"minHeight": min_height, "maxHeight": max_height}
+    j, _ = http_get_any(RPCS, "/blockchain", params=params, deadline=deadline)
+    return metas_from_blockchain(j)
+
+def rpc_batch(calls: list, deadline=None, decode=None):
+    """
+    One JSON-RPC batch POST for [(method, params), ...].
+    Returns the responses in call order ({"result": ...} like a GET, or an exception per call).
+    """
+    payload = [{"jsonrpc": "2.0", "id": i, "method": m, "params": p} for i, (m, p) in enumerate(calls)]
+    j, base = http_get_any(RPCS, "/", json_body=payload, deadline=deadline, decode=decode)
+    if not isinstance(j, list):
+        raise RuntimeError(f"réponse batch invalide: {str(j)[:200]}")
+    by_id = {r.get("id"): r for r in j if isinstance(r, dict)}
+    out = []
+    for i in range(len(calls)):
+        r = by_id.get(i)
+        if r is None:
+            out.append(RuntimeError(f"réponse absente du batch (id={i})"))
+        elif r.get("error"):
+            out.append(RuntimeError(f"JSON-RPC error: {r['error']}"))
+        else:
+            out.append(r)
+    return out, base
+
+
+# ------------------------------------------------------------
+# Adaptive RPC batch size
+# ------------------------------------------------------------
+
+class AdaptiveBatchSize:
+    """
+    Batch size that grows while batches come back fast and shrinks on slow or failed ones.
+    After max_failures consecutive failures the batch path is disabled for the run.
+    """
+
+    def __init__(self, start, lo, hi, target_seconds, max_failures):
+        self.size = start
+        self.lo = lo
+        self.hi = hi
+        self.target_seconds = target_seconds
+        self.max_failures = max_failures
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.failures < self.max_failures
+
+    def ok(self, elapsed: float):
+        with self.lock:
+            self.failures = 0
+            if elapsed < self.target_seconds:
+                self.size = min(self.hi, self.size + max(1, self.size // 4))
+            else:
+                self.size = max(self.lo, self.size // 2)
+
+    def failed(self):
+        with self.lock:
+            self.failures += 1
+            self.size = max(self.lo, self.size // 2)
+
+rpc_batch_size = AdaptiveBatchSize(RPC_BATCH_START, RPC_BATCH_MIN, RPC_BATCH_MAX,
+                                   RPC_BATCH_TARGET_SECONDS, RPC_BATCH_MAX_FAILURES)
+
+def next_chunk(height: int, end: int) -> range:
+    if RPC_BATCH and rpc_batch_size.enabled:
+        n = rpc_batch_size.size
+    else:
+        n = METAS_PER_CALL if SKIP_EMPTY_BLOCKS else 1
+    return range(height, min(end, height + n - 1) + 1)
+
+def rpc_blocks(heights) -> dict:
+    """
+    {height: /block response or exception} for a chunk of heights.
+    Uses one batched POST when enabled; heights that fail inside the batch
+    (or the whole chunk if the POST fails) are retried with unitary GETs.
+    """
+    heights = list(heights)
+    out = {}
+    deadline = deadline_in(BLOCK_DEADLINE)
+    if RPC_BATCH and rpc_batch_size.enabled and len(heights) > 1:
+        t0 = time.monotonic()
+        try:
+            calls = [("block", {"height": str(h)}) for h in heights]
+            results, _ = rpc_batch(calls, deadline=deadline, decode=fast_json.decode_block_batch)
+        except Exception as e:
+            rpc_batch_size.failed()
+            print(f"RPC batch ({len(heights)} blocs) error -> GET unitaires: {e}")
+        else:
+            rpc_batch_size.ok(time.monotonic() - t0)
+            out = {h: r for h, r in zip(heights, results) if not isinstance(r, Exception)}
+            for h, r in out.items():
+                cache_block(h, r)
+
+    for h in heights:
+        if h in out:
+            continue
+        try:
+            out[h], _ = rpc_block(h, deadline=deadline)
+        except Exception as e:
+            out[h] = e
+    return out
+
+def rpc_chunk_metas(chunk: range) -> dict:
+    """
+    {height: (unix_time, num_txs)} for any range of heights, 20 heights per /blockchain call.
+    When batching is enabled, calls go out in POSTs of at most rpc_batch_size.size (<= RPC_BATCH_MAX)
+    calls each, whatever the length of the range.
+    """
+    windows = [(lo, min(lo + METAS_PER_CALL - 1, chunk[-1])) for lo in range(chunk[0], chunk[-1] + 1, METAS_PER_CALL)]
+    metas = {}
+    i = 0
+    while i < len(windows):
+        batched = RPC_BATCH and rpc_batch_size.enabled
+        group = windows[i:i + (min(rpc_batch_size.size, RPC_BATCH_MAX) if batched else 1)]
+        i += len(group)
+        results = None
+        deadline = deadline_in(BLOCK_DEADLINE)
+        if batched and len(group) > 1:
+            try:
+                calls = [("blockchain", {"minHeight": str(lo), "maxHeight": str(hi)}) for lo, hi in group]
+                results, _ = rpc_batch(calls, deadline=deadline)
+            except Exception as e:
+                print(f"RPC batch /blockchain error -> GET unitaires: {e}")
+
+        for j, (lo, hi) in enumerate(group):
+            r = results[j] if results is not None else None
+            if r is None or isinstance(r, Exception):
+                rows = rpc_block_metas(lo, hi, deadline=deadline)
+            else:
+                rows = metas_from_blockchain(r)
+            for h, t, n in rows:
+                metas[h] = (t, n)
+    return metas
+
+def fetch_chunk(chunk: range) -> dict:
+    """
+    {height: (date, txs_b64) or exception} for a chunk of heights.
+    Heights in the disk cache need no request at all. With SKIP_EMPTY_BLOCKS, heights whose
+    meta says num_txs == 0 get their date from the meta and are never downloaded;
+    only the others go through rpc_blocks().
+    """
+    out = {}
+    wanted = []
+    for h in chunk:
+        j = cached_block(h)
+        if j is None:
+            wanted.append(h)
+        else:
+            out[h] = block_date_and_txs(j)
+    if SKIP_EMPTY_BLOCKS and wanted:
+        try:
+            metas = rpc_chunk_metas(range(wanted[0], wanted[-1] + 1))
+        except Exception as e:
+            print(f"/blockchain {wanted[0]}-{wanted[-1]} error -> /block complets: {e}")
+            metas = {}
+        missing = []
+        for h in wanted:
+            m = metas.get(h)
+            if m is not None and m[1] == 0:
+                out[h] = (date_from_unix(m[0]), [])
+                cache_empty_block(h, m[0])
+            else:
+                missing.append(h)
+        wanted = missing
+
+    blocks = rpc_blocks(wanted)
+    for h in wanted:
+        try:
+            out[h] = block_date_and_txs(blocks[h])
+        except Exception as e:
+            out[h] = e
+    return out
+
+
+# ------------------------------------------------------------
+# Disk cache (committed blocks / txs)
+# ------------------------------------------------------------
+
+def cached_block(height: int):
+    """/block-shaped response from the disk cache, or None."""
+    if not CHAIN_CACHE:
+        return None
+    c = chain_cache.get("block", height)
+    if c is None:
+        return None
+    return {"result": {"block": {"header": {"height": str(height), "time": c["time"]}, "data": {"txs": c["txs"]}}}}
+
+def cache_block(height: int, j):
+    """Keep only what the scan reads: header.time and data.txs (as str)."""
+    if not CHAIN_CACHE or isinstance(j, Exception):
+        return
+    try:
+        block = j["result"]["block"]
+        time_iso = block["header"]["time"]
+        txs = block["data"].get("txs", []) or []
+    except (KeyError, TypeError):
+        return
+    txs = [x.decode("ascii") if isinstance(x, bytes) else x for x in txs]
+    chain_cache.put("block", height, {"time": time_iso, "txs": txs})
+
+def cache_empty_block(height: int, unix_time: int):
+    if CHAIN_CACHE:
+        iso = datetime.fromtimestamp(unix_time, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        chain_cache.put("block", height, {"time": iso, "txs": []})
+
 
 # ------------------------------------------------------------
 # Hash computation
@@ -147,11 +564,43 @@ def tm_tx_hash_from_b64(tx_b64: str) -> str:
 # LCD tx by hash
 # ------------------------------------------------------------
 
-def lcd_get_tx_by_hash(tx_hash: str):
-    data, lcd_used = http_get_any(LCDS, f"/cosmos/tx/v1beta1/txs/{tx_hash}", timeout=30)
+def lcd_get_tx_by_hash(tx_hash: str, deadline=None):
+    if CHAIN_CACHE:
+        data = chain_cache.get("tx", tx_hash)
+        if data is not None:
+            return data, "cache"
+    data, lcd_used = http_get_hedged(LCDS, f"/cosmos/tx/v1beta1/txs/{tx_hash}", timeout=30, deadline=deadline)
+    if CHAIN_CACHE and data.get("tx"):
+        chain_cache.put("tx", tx_hash, {"tx": data["tx"]})
     return data, lcd_used
 
 
+# ------------------------------------------------------------
+# LCD txs by block (GetBlockWithTxs)
+# ------------------------------------------------------------
+
+def lcd_get_block_txs(height: int, deadline=None):
+    """
+    All decoded txs of a height, in block order, following the offset pagination.
+    Each tx is wrapped as {"tx": ...} so it has the same shape as a tx-by-hash response.
+    All pages share the same deadline.
+    """
+    if deadline is None:
+        deadline = deadline_in(FETCH_DEADLINE)
+    txs = []
+    lcd_used = None
+    while True:
+        params = {"pagination.offset": len(txs), "pagination.limit": TXS_BLOCK_PAGE_LIMIT}
+        path = f"/cosmos/tx/v1beta1/txs/block/{height}"
+        data, lcd_used = http_get_hedged(LCDS, path, params=params, timeout=30, deadline=deadline)
+        page = data.get("txs", []) or []
+        txs.extend({"tx": t} for t in page)
+        total = int((data.get("pagination") or {}).get("total") or 0)
+        if len(page) < TXS_BLOCK_PAGE_LIMIT or (total and len(txs) >= total):
+            break
+    return txs, lcd_used
+
+
 # ------------------------------------------------------------
 # Extractors
 # ------------------------------------------------------------
@@ -184,75 +633,340 @@ def body_from_lcd_tx(lcd_tx: dict) -> dict:
 
 
 # ------------------------------------------------------------
-# Main
+# Aggregation
 # ------------------------------------------------------------
 
-def main():
-    st, rpc_used = rpc_status()
-    latest = int(st["result"]["sync_info"]["latest_block_height"])
+def new_day_stats() -> dict:
+    return {"tx_total": 0, "tx_ibc": 0, "total_fee_uatom": 0, "ibc_fee_uatom": 0, "lcd_errors": 0}
 
-    state = load_state()
-    if state and state.get("last_height") is not None:
-        start = int(state["last_height"]) + 1
-    else:
-        start = max(1, latest - BLOCK_BATCH)
+def block_date_and_txs(b: dict):
+    if isinstance(b, Exception):
+        raise b
+    block = b["result"]["block"]
+    date = parse_date(block["header"]["time"])
+    txs_b64 = block["data"].get("txs", []) or []
+    return date, txs_b64
 
-    end = min(latest, start + BLOCK_BATCH)
+def summary_from_lcd_tx(lcd_tx: dict) -> tuple:
+    return fee_uatom_from_lcd_tx(lcd_tx), is_ibc_tx(body_from_lcd_tx(lcd_tx))
 
-    print(f"RPC utilisé (status): {rpc_used}")
-    print(f"Scan blocs: {start} -> {end} (latest={latest})")
+def add_tx(day: dict, fee_uatom: int, ibc: bool):
+    day["total_fee_uatom"] += fee_uatom
+    if ibc:
+        day["tx_ibc"] += 1
+        day["ibc_fee_uatom"] += fee_uatom
 
-    atom_price = get_atom_price_usd()
-    print(f"ATOM price used (USD): {atom_price}")
+def apply_block(day: dict, height: int, n_txs: int, results: list) -> bool:
+    """
+    Add one block to its day. `results` holds (fee_uatom, is_ibc) per tx in block order;
+    an exception stands for the first failed lookup. Returns False if the block is incomplete,
+    in which case only lcd_errors changes: the block is re-counted in full when retried.
+    """
+    block = new_day_stats()
+    block["tx_total"] = n_txs
+    for res in results:
+        if isinstance(res, Exception):
+            day["lcd_errors"] += 1
+            print(f"[{height}] LCD /txs/{{hash}} error -> STOP (sans trou): {res}")
+            return False
+        add_tx(block, *res)
+    for k, v in block.items():
+        day[k] += v
+    return True
+
+def commit_chunk(chunk: range, outcomes, by_date: dict):
+    """
+    Add a chunk's blocks to by_date in height order, stopping at the first failure.
+    `outcomes` yields (date, n_txs, results) or an exception per height (may be lazy).
+    Returns (last committed height or None, stopped).
+    """
+    last = None
+    for height, out in zip(chunk, outcomes):
+        if isinstance(out, Exception):
+            print(f"[{height}] RPC /block error -> STOP: {out}")
+            return last, True
+
+        # ne pas avancer state si bloc incomplet
+        date, n_txs, results = out
+        day = by_date.setdefault(date, new_day_stats())
+        if not apply_block(day, height, n_txs, results):
+            return last, True
+        last = height
+    return last, False
 
-    by_date = {}
-    last_ok = None
 
-    for height in range(start, end + 1):
-        # get block (includes tx bytes)
+# ------------------------------------------------------------
+# Tx retrieval strategies
+# ------------------------------------------------------------
+
+def txs_via_local_decode(height: int, txs_b64: list):
+    """Decode fees and message types from the raw block bytes; None if any tx can't be decoded."""
+    try:
+        return [decode_tx_summary(base64.b64decode(x)) for x in txs_b64]
+    except Exception as e:
+        print(f"[{height}] décodage protobuf local impossible -> fallback LCD: {e}")
+        return None
+
+def txs_via_block_route(height: int, n_txs: int, deadline=None):
+    """One paginated LCD call for the whole block; None if the caller must fall back to per-hash."""
+    txs = chain_cache.get("lcdblock", height) if CHAIN_CACHE else None
+    if txs is None or len(txs) != n_txs:
         try:
-            b, _ = rpc_block(height)
-            header = b["result"]["block"]["header"]
-            date = parse_date(header["time"])
-            txs_b64 = b["result"]["block"]["data"].get("txs", []) or []
+            txs, _lcd = lcd_get_block_txs(height, deadline=deadline)
         except Exception as e:
-            print(f"[{height}] RPC /block error -> STOP: {e}")
+            print(f"[{height}] LCD /txs/block error -> fallback par hash: {e}")
+            return None
+        if len(txs) != n_txs:
+            print(f"[{height}] LCD /txs/block: {len(txs)} tx au lieu de {n_txs} -> fallback par hash")
+            return None
+        if CHAIN_CACHE:
+            chain_cache.put("lcdblock", height, txs)
+    return [summary_from_lcd_tx(t) for t in txs]
+
+def txs_via_hash(txs_b64: list, deadline=None) -> list:
+    # per tx -> LCD by hash, stops at the first failure
+    results = []
+    for x in txs_b64:
+        try:
+            lcd_tx, _lcd = lcd_get_tx_by_hash(tm_tx_hash_from_b64(x), deadline=deadline)
+        except Exception as e:
+            results.append(e)
             break
+        results.append(summary_from_lcd_tx(lcd_tx))
+    return results
 
-        if date not in by_date:
-            by_date[date] = {"tx_total": 0, "tx_ibc": 0, "total_fee_uatom": 0, "ibc_fee_uatom": 0, "lcd_errors": 0}
+def block_tx_summaries(height: int, txs_b64: list) -> list:
+    if not txs_b64:
+        return []
+    if TX_FETCH_MODE == "local":
+        txs = txs_via_local_decode(height, txs_b64)
+        if txs is not None:
+            return txs
+    # un seul budget pour tous les appels LCD du bloc, fallbacks compris
+    deadline = deadline_in(BLOCK_DEADLINE)
+    if TX_FETCH_MODE in ("local", "block"):
+        txs = txs_via_block_route(height, len(txs_b64), deadline)
+        if txs is not None:
+            return txs
+    return txs_via_hash(txs_b64, deadline)
 
-        hashes = [tm_tx_hash_from_b64(x) for x in txs_b64]
-        by_date[date]["tx_total"] += len(hashes)
 
-        # per tx -> LCD by hash
-        for h in hashes:
-            try:
-                lcd_tx, _lcd = lcd_get_tx_by_hash(h)
-            except Exception as e:
-                by_date[date]["lcd_errors"] += 1
-                print(f"[{height}] LCD /txs/{{hash}} error -> STOP (sans trou): {e}")
-                # ne pas avancer state si bloc incomplet
-                hashes = None
-                break
+# ------------------------------------------------------------
+# Scan (séquentiel)
+# ------------------------------------------------------------
 
-            fu = fee_uatom_from_lcd_tx(lcd_tx)
-            by_date[date]["total_fee_uatom"] += fu
+def block_outcome(height: int, blk):
+    if isinstance(blk, Exception):
+        return blk
+    date, txs_b64 = blk
+    return date, len(txs_b64), block_tx_summaries(height, txs_b64)
 
-            body = body_from_lcd_tx(lcd_tx)
-            if is_ibc_tx(body):
-                by_date[date]["tx_ibc"] += 1
-                by_date[date]["ibc_fee_uatom"] += fu
+def scan_range(start: int, end: int, by_date: dict, checkpoint=None):
+    """Scan start..end into by_date; `checkpoint(last_height)` (default: save start..last) runs after each chunk."""
+    checkpoint = checkpoint or (lambda last: save_state(last, first=start))
+    last_ok = None
+    height = start
 
-            time.sleep(SLEEP_BETWEEN_TXS)
+    while height <= end:
+        chunk = next_chunk(height, end)
+        blocks = fetch_chunk(chunk)
+        height = chunk[-1] + 1
 
-        if hashes is None:
+        # outcomes paresseux : rien n'est récupéré après le 1er bloc en échec
+        last, stopped = commit_chunk(chunk, (block_outcome(h, blocks[h]) for h in chunk), by_date)
+        if last is not None:
+            checkpoint(last)
+            last_ok = last
+        if stopped:
             break
 
-        save_state(height)
-        last_ok = height
-        time.sleep(SLEEP_BETWEEN_BLOCKS)
+    return last_ok
+
+
+# ------------------------------------------------------------
+# Scan (asyncio, concurrence bornée)
+# ------------------------------------------------------------
+
+async def chunk_cpu_stage(chunk: range, blocks: dict, cpu_pool=None) -> dict:
+    """
+    {height: per-tx records} for the blocks of a chunk: (fee_uatom, is_ibc) or None
+    (undecodable) in "local" mode, tx hashes in "hash" mode, nothing in "block" mode.
+    All txs of the chunk go to the pool as one packed blob and come back as flat buffers.
+    """
+    if TX_FETCH_MODE not in ("local", "hash"):
+        return {}
+    items = [(h, blocks[h][1]) for h in chunk if not isinstance(blocks[h], Exception) and blocks[h][1]]
+    n = sum(len(txs) for _h, txs in items)
+    if not n:
+        return {}
+
+    blob = cosmos_tx_proto.pack_b64_batch(x for _h, txs in items for x in txs)
+    work = cosmos_tx_proto.decode_b64_batch if TX_FETCH_MODE == "local" else cosmos_tx_proto.hash_b64_batch
+    if cpu_pool is not None and n >= DECODE_POOL_MIN_TXS:
+        packed = await asyncio.get_running_loop().run_in_executor(cpu_pool, work, blob)
+    else:
+        packed = work(blob)
+    if TX_FETCH_MODE == "local":
+        records = cosmos_tx_proto.unpack_summaries(*packed)
+    else:
+        records = cosmos_tx_proto.unpack_hashes(packed)
+
+    out = {}
+    i = 0
+    for h, txs in items:
+        out[h] = records[i:i + len(txs)]
+        i += len(txs)
+    return out
 
+class BlockBudget:
+    """
+    One BLOCK_DEADLINE for all the LCD lookups of a block, started by the first lookup that
+    actually runs: time spent queued in a busy thread executor behind other blocks doesn't count.
+    """
+
+    def __init__(self, seconds: float = None):
+        self.seconds = BLOCK_DEADLINE if seconds is None else seconds
+        self.deadline = None
+        self.lock = threading.Lock()
+
+    def run(self, fn, *args):
+        """fn(*args, deadline=...) with the block's deadline, starting it if needed."""
+        with self.lock:
+            if self.deadline is None:
+                self.deadline = deadline_in(self.seconds)
+        return fn(*args, deadline=self.deadline)
+
+def tx_summary_by_hash(tx_hash: str, deadline=None) -> tuple:
+    # résumé calculé dans le thread : la réponse LCD complète n'est pas gardée jusqu'au gather
+    lcd_tx, _lcd = lcd_get_tx_by_hash(tx_hash, deadline=deadline)
+    return summary_from_lcd_tx(lcd_tx)
+
+async def block_txs_async(height: int, blk, records=None):
+    """
+    Txs of one already-fetched block, LCD lookups running concurrently.
+    `records` is this block's chunk_cpu_stage() output.
+    Returns (date, n_txs, results) where results[i] is (fee_uatom, is_ibc) or the exception raised.
+    """
+    if isinstance(blk, Exception):
+        raise blk
+    date, txs_b64 = blk
+    if txs_b64 and TX_FETCH_MODE == "local":
+        if records is None:
+            # étage CPU du chunk en échec : décodage du bloc ici, le LCD reste pour les txs indécodables
+            records = txs_via_local_decode(height, txs_b64)
+            if records is not None:
+                return date, len(txs_b64), records
+        elif None not in records:
+            return date, len(txs_b64), records
+        else:
+            print(f"[{height}] décodage protobuf local impossible -> fallback LCD")
+    # budget du bloc démarré par son premier appel LCD, pas à la mise en file de l'executor
+    budget = BlockBudget()
+    if txs_b64 and TX_FETCH_MODE in ("local", "block"):
+        txs = await asyncio.to_thread(budget.run, txs_via_block_route, height, len(txs_b64))
+        if txs is not None:
+            return date, len(txs_b64), txs
+    hashes = records if TX_FETCH_MODE == "hash" and records is not None else [tm_tx_hash_from_b64(x) for x in txs_b64]
+    results = await asyncio.gather(
+        *(asyncio.to_thread(budget.run, tx_summary_by_hash, tx_hash) for tx_hash in hashes),
+        return_exceptions=True,
+    )
+    return date, len(txs_b64), results
+
+def new_cpu_pool():
+    """Process pool of the async scan's CPU stage, None when DECODE_WORKERS <= 1."""
+    if DECODE_WORKERS <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=DECODE_WORKERS, mp_context=multiprocessing.get_context(DECODE_START_METHOD))
+
+async def fetch_chunk_async(chunk: range, sem: asyncio.Semaphore, cpu: dict = None):
+    """
+    Fetch a chunk of blocks (one batched POST when enabled) and their txs; one outcome per height.
+    `cpu` is {"pool": ProcessPoolExecutor or None}, shared by the chunks of a scan: a broken
+    pool is replaced there for the chunks that follow.
+    """
+    async with sem:
+        blocks = await asyncio.to_thread(fetch_chunk, chunk)
+        cpu_pool = cpu["pool"] if cpu else None
+        try:
+            records = await chunk_cpu_stage(chunk, blocks, cpu_pool)
+        except Exception as e:
+            print(f"Étage CPU {chunk[0]}-{chunk[-1]} error -> décodage par bloc: {e}")
+            records = {}
+            if isinstance(e, BrokenProcessPool) and cpu["pool"] is cpu_pool:
+                cpu["pool"] = new_cpu_pool()
+                cpu_pool.shutdown(wait=False, cancel_futures=True)
+        return await asyncio.gather(
+            *(block_txs_async(h, blocks[h], records.get(h)) for h in chunk),
+            return_exceptions=True,
+        )
+
+async def scan_range_async(start: int, end: int, by_date: dict, checkpoint=None):
+    """
+    Same aggregates as scan_range(), but keeps SCAN_CONCURRENCY chunks of blocks in flight.
+    Blocks are committed strictly in height order, so the state never skips a height.
+    At most SCAN_MAX_BUFFERED_BLOCKS blocks are launched ahead of the commit point.
+    """
+    checkpoint = checkpoint or (lambda last: save_state(last, first=start))
+    loop = asyncio.get_running_loop()
+    n_hosts = len(set(urlsplit(u).netloc for u in RPCS + LCDS))
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=http_client.POOL_MAXSIZE * n_hosts))
+
+    cpu = {"pool": new_cpu_pool()}
+
+    sem = asyncio.Semaphore(SCAN_CONCURRENCY)
+    window = SCAN_CONCURRENCY * 4
+    next_height = start
+    pending = deque()
+
+    def launch():
+        nonlocal next_height
+        while len(pending) < window and next_height <= end:
+            if pending and next_height - pending[0][0][0] >= SCAN_MAX_BUFFERED_BLOCKS:
+                break
+            chunk = next_chunk(next_height, end)
+            next_height = chunk[-1] + 1
+            pending.append((chunk, asyncio.ensure_future(fetch_chunk_async(chunk, sem, cpu))))
+
+    last_ok = None
+    launch()
+    try:
+        while pending:
+            chunk, task = pending.popleft()
+            outcomes = await task
+            launch()
+
+            # même sémantique que le scan séquentiel : on s'arrête au 1er bloc/tx en échec
+            last, stopped = commit_chunk(chunk, outcomes, by_date)
+            if last is not None:
+                checkpoint(last)
+                last_ok = last
+            if stopped:
+                break
+    finally:
+        for _chunk, task in pending:
+            task.cancel()
+        await asyncio.gather(*(t for _chunk, t in pending), return_exceptions=True)
+        if cpu["pool"] is not None:
+            cpu["pool"].shutdown(cancel_futures=True)
+
+    return last_ok
+
+
+# ------------------------------------------------------------
+# Output
+# ------------------------------------------------------------
+
+def merge_daily(df_old, df_new):
+    """Previous CSV + this run's rows, summed per date, ratios recomputed."""
+    df = pd.concat([df_old, df_new], ignore_index=True)
+    num_cols = [c for c in df.columns if c != "date"]
+    df = df.groupby("date", as_index=False)[num_cols].sum()
+    df["tx_ibc_ratio_pct"] = df.apply(lambda r: (r["tx_ibc"] / r["tx_total"] * 100.0) if r["tx_total"] else 0.0, axis=1)
+    df["ibc_fee_share_pct"] = df.apply(lambda r: (r["ibc_fee_uatom"] / r["total_fee_uatom"] * 100.0) if r["total_fee_uatom"] else 0.0, axis=1)
+    return df
+
+def write_daily_csv(by_date: dict, atom_price: float):
     # Build df for this run
     rows = []
     for date, v in sorted(by_date.items()):
@@ -272,12 +986,7 @@ def main():
     df_new = pd.DataFrame(rows)
 
     if os.path.exists(OUTFILE):
-        df_old = pd.read_csv(OUTFILE)
-        df = pd.concat([df_old, df_new], ignore_index=True)
-        num_cols = [c for c in df.columns if c != "date"]
-        df = df.groupby("date", as_index=False)[num_cols].sum()
-        df["tx_ibc_ratio_pct"] = df.apply(lambda r: (r["tx_ibc"] / r["tx_total"] * 100.0) if r["tx_total"] else 0.0, axis=1)
-        df["ibc_fee_share_pct"] = df.apply(lambda r: (r["ibc_fee_uatom"] / r["total_fee_uatom"] * 100.0) if r["total_fee_uatom"] else 0.0, axis=1)
+        df = merge_daily(pd.read_csv(OUTFILE), df_new)
     else:
         df = df_new
 
@@ -289,6 +998,65 @@ def main():
 
     df = df.sort_values("date")
     df.to_csv(OUTFILE, index=False)
+    return df
+
+
+# ------------------------------------------------------------
+# Main
+# ------------------------------------------------------------
+
+def yesterday_range(sync_info: dict):
+    """Exact (first, last) heights of the previous UTC day, via the persistent height index."""
+    earliest = int(sync_info.get("earliest_block_height") or 1)
+    latest = int(sync_info["latest_block_height"])
+    yesterday = str((datetime.now(timezone.utc) - timedelta(days=1)).date())
+
+    index = HeightIndex(rpc_block_metas)
+    first, last = index.day_range(yesterday, earliest, latest)
+    index.save()
+    print(f"Index hauteurs: {yesterday} = {first} -> {last} ({index.calls} appels /blockchain)")
+    return first, last
+
+def main():
+    st, rpc_used = rpc_status()
+    sync_info = st["result"]["sync_info"]
+    latest = int(sync_info["latest_block_height"])
+
+    batch = ASYNC_BLOCK_BATCH if ASYNC_SCAN else BLOCK_BATCH
+
+    state = load_state()
+    if state and state.get("last_height") is not None:
+        start = int(state["last_height"]) + 1
+        # curseur côté tête : rien n'est fait au-delà, les trous plus bas sont pour backfill --dates
+        end = min(latest, start + batch)
+    else:
+        # pas de state : on cible exactement la veille (UTC) plutôt qu'une fenêtre arbitraire
+        try:
+            start, end = yesterday_range(sync_info)
+        except Exception as e:
+            print(f"Index hauteurs indisponible: {e}")
+            start = end = None
+        if start is None or end is None:
+            start = max(1, latest - batch)
+            end = min(latest, start + batch)
+
+    print(f"RPC utilisé (status): {rpc_used}")
+    print(f"Scan blocs: {start} -> {end} (latest={latest})")
+
+    atom_price = get_atom_price_usd()
+    print(f"ATOM price used (USD): {atom_price}")
+
+    by_date = {}
+    if ASYNC_SCAN:
+        print(f"Mode async: {SCAN_CONCURRENCY} requêtes /block en vol, {http_client.POOL_MAXSIZE} requêtes/hôte max")
+        last_ok = asyncio.run(scan_range_async(start, end, by_date))
+    else:
+        last_ok = scan_range(start, end, by_date)
+
+    # hauteurs déjà marquées faites par les checkpoints du scan ; le CSV est relu et réécrit sous
+    # le même verrou que le suivi de tête et les backfills, pour ne perdre aucune de leurs fusions
+    with state_lock():
+        df = write_daily_csv(by_date, atom_price)
 
     print("\nOK ->", OUTFILE)
     if last_ok:
@@ -1,13 +1,14 @@
 import os
-import requests
 import pandas as pd
 import numpy as np
 
-LCDS = [
+import http_client
+
+LCDS = http_client.endpoints([
     "https://cosmos-api.polkachu.com",
     "https://lcd.cosmoshub.strange.love",
     "https://api.cosmos.network",
-]
+])
 
 INFILE = "hub_revenue_daily.csv"
 OUTFILE = "hub_revenue_with_inflation.csv"
@@ -16,9 +17,9 @@ UAATOM_PER_ATOM = 1_000_000
 
 def http_get_any(path, timeout=15):
     last_err = None
-    for base in LCDS:
+    for base in http_client.router.order(LCDS):
         try:
-            r = requests.get(base.rstrip("/") + path, timeout=timeout)
+            r = http_client.get(base.rstrip("/") + path, timeout=timeout, endpoint=base)
             r.raise_for_status()
             return r.json(), base
         except Exception as e:
@@ -35,12 +36,16 @@ def get_supply_atom():
     return supply_uatom / UAATOM_PER_ATOM, used
 
 def get_atom_price_usd():
-    url = "https://api.coingecko.com/api/v3/simple/price"
+    url = http_client.service_url("https://api.coingecko.com/api/v3/simple/price")
     params = {"ids": "cosmos", "vs_currencies": "usd"}
-    r = requests.get(url, params=params, timeout=20)
+    r = http_client.get(url, params=params, timeout=20)
     r.raise_for_status()
     return float(r.json()["cosmos"]["usd"])
 
+def coverage_pct(fee_atom, base_atom):
+    """fee / base in %, NaN where the base (emission, net issuance) is unknown or <= 0."""
+    return np.where(base_atom > 0, (fee_atom / base_atom) * 100.0, np.nan)
+
 def main():
     if not os.path.exists(INFILE):
         print(f"Fichier introuvable: {INFILE}")
@@ -120,16 +125,8 @@ def main():
     enriched["estimated_daily_emission_atom"] = (enriched["total_supply_atom"] * inflation) / 365.0
 
     # Coverage vs estimated emission (only where emission is known)
-    enriched["fee_coverage_pct"] = np.where(
-        enriched["estimated_daily_emission_atom"] > 0,
-        (enriched["total_fee_atom"] / enriched["estimated_daily_emission_atom"]) * 100.0,
-        np.nan
-    )
-    enriched["ibc_fee_coverage_pct"] = np.where(
-        enriched["estimated_daily_emission_atom"] > 0,
-        (enriched["ibc_fee_atom"] / enriched["estimated_daily_emission_atom"]) * 100.0,
-        np.nan
-    )
+    enriched["fee_coverage_pct"] = coverage_pct(enriched["total_fee_atom"], enriched["estimated_daily_emission_atom"])
+    enriched["ibc_fee_coverage_pct"] = coverage_pct(enriched["ibc_fee_atom"], enriched["estimated_daily_emission_atom"])
 
     # --- NEW: net issuance via daily supply snapshots ---
     enriched = enriched.sort_values("date")
@@ -137,16 +134,8 @@ def main():
     enriched["net_issuance_usd"] = enriched["net_issuance_atom"] * atom_price
 
     # Coverage vs net issuance (only where net issuance > 0)
-    enriched["fee_coverage_net_pct"] = np.where(
-        enriched["net_issuance_atom"] > 0,
-        (enriched["total_fee_atom"] / enriched["net_issuance_atom"]) * 100.0,
-        np.nan
-    )
-    enriched["ibc_fee_coverage_net_pct"] = np.where(
-        enriched["net_issuance_atom"] > 0,
-        (enriched["ibc_fee_atom"] / enriched["net_issuance_atom"]) * 100.0,
-        np.nan
-    )
+    enriched["fee_coverage_net_pct"] = coverage_pct(enriched["total_fee_atom"], enriched["net_issuance_atom"])
+    enriched["ibc_fee_coverage_net_pct"] = coverage_pct(enriched["ibc_fee_atom"], enriched["net_issuance_atom"])
 
     # Net dilution metrics
     enriched["net_daily_dilution_atom_estimated"] = enriched["estimated_daily_emission_atom"] - enriched["total_fee_atom"]
@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import standin_server
+from bench_scanner import parse_overrides, run_scanner, scan, scanner
+from synth_chain import SyntheticChain
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+
+SOAK_OUT = "soak_scanner.json"
+
+BLOCKS = 2_000_000
+MEAN_TXS = 3
+SAMPLE_SECONDS = 2.0
+WARMUP_FRACTION = 0.1       # pools, caches et buffers se remplissent : pas mesuré
+TRACE_FRAMES = 1            # profondeur des traces tracemalloc (1 = le moins coûteux)
+TOP_HOT_SPOTS = 15
+
+# croissance tolérée entre la fin du warmup et la fin du run (pente x blocs restants)
+MAX_TRACED_GROWTH_MB = 16.0
+MAX_RSS_GROWTH_MB = 64.0
+
+
+# ------------------------------------------------------------
+# Scanner run (child process)
+# ------------------------------------------------------------
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except OSError:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / 1024 ** 2 if sys.platform == "darwin" else rss / 1024
+
+def hot_spots(before, after) -> list:
+    """Allocation sites that grew the most between two tracemalloc snapshots."""
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+    stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+    stats = sorted((s for s in stats if s.size_diff > 0), key=lambda s: s.size_diff, reverse=True)
+    return [{
+        "where": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+        "size_diff_kb": round(s.size_diff / 1024, 1),
+        "count_diff": s.count_diff,
+        "size_kb": round(s.size / 1024, 1),
+    } for s in stats[:TOP_HOT_SPOTS]]
+
+def child(end: int, result_path: str, overrides: list, trace: bool):
+    """Runs in a fresh interpreter whose HUB_STANDIN_URL points at the soak server."""
+    hub = scanner(overrides)
+    if trace:
+        tracemalloc.start(TRACE_FRAMES)
+    warmup = max(1, int(end * WARMUP_FRACTION))
+    progress = {"last": 0}
+    samples = []
+    snapshots = {}
+    done = threading.Event()
+
+    def sample():
+        traced = tracemalloc.get_traced_memory()[0] / 1024 ** 2 if trace else None
+        samples.append({"t": round(time.perf_counter() - t0, 2), "blocks": progress["last"],
+                        "rss_mb": round(rss_mb(), 2), "traced_mb": traced and round(traced, 2)})
+        if trace and "warmup" not in snapshots and progress["last"] >= warmup:
+            snapshots["warmup"] = tracemalloc.take_snapshot()
+
+    def sampler():
+        while not done.wait(SAMPLE_SECONDS):
+            sample()
+
+    def checkpoint(h: int):
+        progress["last"] = h
+
+    by_date = {}
+    t0 = time.perf_counter()
+    thread = threading.Thread(target=sampler, daemon=True)
+    thread.start()
+    try:
+        last = scan(hub, end, by_date, checkpoint)
+    finally:
+        done.set()
+        thread.join()
+    sample()
+    wall = time.perf_counter() - t0
+
+    result = {"wall_s": wall, "last_height": last, "warmup_blocks": warmup, "days": len(by_date), "samples": samples}
+    if trace and "warmup" in snapshots:
+        result["hot_spots"] = hot_spots(snapshots["warmup"], tracemalloc.take_snapshot())
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+# ------------------------------------------------------------
+# Growth check
+# ------------------------------------------------------------
+
+def slope(points: list) -> float:
+    """Least-squares slope of y over x."""
+    n = len(points)
+    mx = sum(x for x, _ in points) / n
+    my = sum(y for _, y in points) / n
+    var = sum((x - mx) ** 2 for x, _ in points)
+    return sum((x - mx) * (y - my) for x, y in points) / var if var else 0.0
+
+def growth(samples: list, metric: str, warmup: int):
+    """MB gained per million blocks after warmup, and projected over the measured span (None if too few samples)."""
+    points = [(s["blocks"], s[metric]) for s in samples if s["blocks"] >= warmup and s[metric] is not None]
+    if len(points) < 3 or points[-1][0] == points[0][0]:
+        return None
+    per_block = slope(points)
+    return {"mb_per_million_blocks": round(per_block * 1e6, 2),
+            "projected_mb": round(per_block * (points[-1][0] - points[0][0]), 2),
+            "start_mb": points[0][1], "end_mb": points[-1][1]}
+
+def check(result: dict, max_traced: float, max_rss: float) -> list:
+    failures = []
+    for metric, limit in (("traced_mb", max_traced), ("rss_mb", max_rss)):
+        g = result["growth"].get(metric)
+        if g is not None and g["projected_mb"] > limit:
+            failures.append(f"{metric}: +{g['projected_mb']} Mo sur le run ({g['mb_per_million_blocks']} Mo / M blocs), "
+                            f"limite {limit} Mo")
+    return failures
+
+
+# ------------------------------------------------------------
+# Run
+# ------------------------------------------------------------
+
+def run_soak(n_blocks: int, mean_txs: float, specs: list, trace: bool) -> dict:
+    chain = SyntheticChain(n_blocks, mean_txs)
+    server = standin_server.serve(chain, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with tempfile.TemporaryDirectory(prefix="soak_scanner_") as workdir:
+            result, _cpu, _rss = run_scanner(url, n_blocks, workdir, specs, script=__file__,
+                                             extra_args=[] if trace else ["--no-tracemalloc"])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    warmup = result["warmup_blocks"]
+    result["growth"] = {m: growth(result["samples"], m, warmup) for m in ("traced_mb", "rss_mb")}
+    result["blocks"] = n_blocks
+    result["blocks_per_s"] = round((result["last_height"] or 0) / result["wall_s"], 1)
+    return result
+
+
+def main():
+    # python soak_scanner.py                               (2M blocs synthétiques, tracemalloc actif)
+    # python soak_scanner.py --blocks 5000000 --no-tracemalloc --set TX_FETCH_MODE='"hash"'
+    ap = argparse.ArgumentParser(description="Soak test mémoire du scanner sur une longue chaîne synthétique")
+    ap.add_argument("--blocks", type=int, default=BLOCKS)
+    ap.add_argument("--mean-txs", type=float, default=MEAN_TXS)
+    ap.add_argument("--set", action="append", default=[], metavar="NAME=JSON",
+                    help="surcharge d'une constante de hub_fee_monitor_v41 (répétable)")
+    ap.add_argument("--no-tracemalloc", action="store_true", help="RSS seule (scan plus rapide, pas de hot spots)")
+    ap.add_argument("--max-traced-growth", type=float, default=MAX_TRACED_GROWTH_MB)
+    ap.add_argument("--max-rss-growth", type=float, default=MAX_RSS_GROWTH_MB)
+    ap.add_argument("--out", default=SOAK_OUT)
+    ap.add_argument("--child", nargs=2, metavar=("END", "RESULT"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    trace = not args.no_tracemalloc
+    if args.child:
+        child(int(args.child[0]), args.child[1], parse_overrides(args.set), trace)
+        return
+
+    print(f"Soak: {args.blocks} blocs, {args.mean_txs} txs/bloc en moyenne, tracemalloc {'actif' if trace else 'inactif'}", flush=True)
+    result = run_soak(args.blocks, args.mean_txs, args.set, trace)
+    result.update({
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "overrides": args.set,
+    })
+    failures = check(result, args.max_traced_growth, args.max_rss_growth)
+    if result["last_height"] != args.blocks:
+        failures.append(f"scan arrêté au bloc {result['last_height']} sur {args.blocks}")
+    result["failures"] = failures
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+    print(f"{result['last_height']} blocs en {result['wall_s']:.0f} s ({result['blocks_per_s']} blocs/s), "
+          f"{len(result['samples'])} échantillons")
+    for metric, g in result["growth"].items():
+        if g is not None:
+            print(f"  {metric}: {g['start_mb']} -> {g['end_mb']} Mo après warmup, "
+                  f"pente {g['mb_per_million_blocks']} Mo / M blocs")
+    if result.get("hot_spots"):
+        print("\nAllocations en hausse depuis la fin du warmup :")
+        for h in result["hot_spots"]:
+            print(f"  {h['size_diff_kb']:>+10.1f} Ko  {h['count_diff']:>+8}  {h['where']}")
+    print(f"\nRésultats -> {args.out}")
+    if failures:
+        print("\nCroissance mémoire :")
+        for f in failures:
+            print("  " + f)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
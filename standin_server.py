@@ -0,0 +1,478 @@
+import argparse
+import hashlib
+import os
+import random
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import fast_json
+import http_client
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+
+FIXTURES_DIR = "fixtures"
+HOST = "127.0.0.1"
+PORT = 8765
+PRICE_UPSTREAM = "https://api.coingecko.com"
+WRITE_CHUNK = 16 * 1024
+METAS_PER_CALL = 20
+TX_ROUTE = "/cosmos/tx/v1beta1/txs/"
+
+# Injection de pannes (Faults) : valeurs par défaut de chaque type
+FAULT_DEFAULTS = {
+    "429": {"retry_after": 1.0},      # Retry-After envoyé (0 = pas d'en-tête)
+    "5xx": {"status": 502},
+    "reset": {},                      # RST TCP sans réponse
+    "slow": {"seconds": 5.0},         # réponse normale, après ce délai
+    "truncate": {"keep": 0.5},        # fraction du corps JSON envoyée (Content-Length cohérent)
+    "tx404": {"seconds": 10.0},       # tx pas encore indexée pendant N s après sa 1re demande
+}
+TX404_SEEN_MAX = 200_000              # 1res demandes de tx gardées (les plus anciennes sont oubliées)
+
+
+# ------------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------------
+#
+# <FIXTURES_DIR>/status.json          /status
+# <FIXTURES_DIR>/block/<h>.json       /block?height=h (full response)
+# <FIXTURES_DIR>/meta/<h>.json        one /blockchain block_meta ; any window is rebuilt from them
+# <FIXTURES_DIR>/tx/<HASH>.json       LCD /cosmos/tx/v1beta1/txs/{hash}
+# <FIXTURES_DIR>/lcdblock/<h>.json    LCD /cosmos/tx/v1beta1/txs/block/{h}, all pages merged
+# <FIXTURES_DIR>/route/<sha1>.json    anything else (mint, bank, price...), keyed by path + sorted query
+#
+# Blocks, metas and txs are stored per height / hash rather than per request, so a replay
+# answers any batching, window or pagination the client chooses.
+
+class FixtureStore:
+    def __init__(self, root: str = FIXTURES_DIR):
+        self.root = root
+
+    def path(self, kind: str, key=None) -> str:
+        if key is None:
+            return os.path.join(self.root, kind + ".json")
+        return os.path.join(self.root, kind, f"{key}.json")
+
+    def get(self, kind: str, key=None):
+        try:
+            with open(self.path(kind, key), "rb") as f:
+                return fast_json.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def put(self, kind: str, key, obj):
+        p = self.path(kind, key)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        tmp = f"{p}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(fast_json.dumps(obj))
+        os.replace(tmp, p)
+
+def route_key(path: str, params: dict) -> str:
+    canonical = path + "?" + urlencode(sorted(params.items()))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+class NotFound(Exception):
+    pass
+
+
+# ------------------------------------------------------------
+# Resolver (replay, optionally recording misses from the real endpoints)
+# ------------------------------------------------------------
+
+class Resolver:
+    """
+    Answers (path, params) from the fixtures. With `record`, a miss is fetched from the
+    real RPC / LCD / price endpoints (hub_fee_monitor_v41 config) and stored first.
+    """
+
+    def __init__(self, store: FixtureStore, record: bool = False):
+        self.store = store
+        self.record = record
+        if record:
+            if http_client.STANDIN_URL:
+                raise RuntimeError("HUB_STANDIN_URL est défini : l'enregistrement interrogerait le serveur lui-même")
+            import hub_fee_monitor_v41 as hub
+            self.hub = hub
+
+    # --- upstream ---
+
+    def upstream(self, path: str, params: dict):
+        if path.startswith("/cosmos/"):
+            j, _ = self.hub.http_get_any(self.hub.LCDS, path, params=params or None)
+            return j
+        if path.startswith("/api/"):
+            r = http_client.get(PRICE_UPSTREAM + path, params=params or None, timeout=20)
+            r.raise_for_status()
+            return fast_json.loads(r.content)
+        j, _ = self.hub.http_get_any(self.hub.RPCS, path, params=params or None)
+        return j
+
+    # --- routes ---
+
+    def status(self):
+        j = self.store.get("status")
+        if j is None and self.record:
+            j = self.upstream("/status", {})
+            self.store.put("status", None, j)
+        if j is None:
+            raise NotFound("status")
+        return j
+
+    def block(self, height: int):
+        j = self.store.get("block", height)
+        if j is None and self.record:
+            j = self.upstream("/block", {"height": str(height)})
+            self.store.put("block", height, j)
+        if j is None:
+            raise NotFound(f"height {height} is not available")
+        return j
+
+    def blockchain(self, lo: int, hi: int):
+        last = self.status()["result"]["sync_info"]["latest_block_height"]
+        hi = min(hi, int(last), lo + METAS_PER_CALL - 1)
+        metas = [self.store.get("meta", h) for h in range(hi, lo - 1, -1)]
+        if any(m is None for m in metas):
+            if not self.record:
+                raise NotFound(f"block metas {lo}-{hi} incomplets")
+            j = self.upstream("/blockchain", {"minHeight": str(lo), "maxHeight": str(hi)})
+            for m in j["result"].get("block_metas", []) or []:
+                self.store.put("meta", int(m["header"]["height"]), m)
+            return j
+        return {"jsonrpc": "2.0", "id": -1, "result": {"last_height": last, "block_metas": metas}}
+
+    def tx(self, tx_hash: str):
+        j = self.store.get("tx", tx_hash)
+        if j is None and self.record:
+            j = self.upstream(f"/cosmos/tx/v1beta1/txs/{tx_hash}", {})
+            self.store.put("tx", tx_hash, j)
+        if j is None:
+            raise NotFound(f"tx {tx_hash} not found")
+        return j
+
+    def lcd_block(self, height: int, offset: int, limit: int):
+        j = self.store.get("lcdblock", height)
+        if j is None and self.record:
+            path = f"/cosmos/tx/v1beta1/txs/block/{height}"
+            txs, block = [], None
+            while True:
+                page = self.upstream(path, {"pagination.offset": str(len(txs)), "pagination.limit": "100"})
+                block = block or page.get("block")
+                got = page.get("txs", []) or []
+                txs += got
+                total = int((page.get("pagination") or {}).get("total") or 0)
+                if len(got) < 100 or (total and len(txs) >= total):
+                    break
+            j = {"txs": txs, "block": block}
+            self.store.put("lcdblock", height, j)
+        if j is None:
+            raise NotFound(f"txs of block {height} not found")
+        return {
+            "txs": j["txs"][offset:offset + limit],
+            "block": j["block"],
+            "pagination": {"next_key": None, "total": str(len(j["txs"]))},
+        }
+
+    def other(self, path: str, params: dict):
+        key = route_key(path, params)
+        j = self.store.get("route", key)
+        if j is None and self.record:
+            j = self.upstream(path, params)
+            self.store.put("route", key, j)
+        if j is None:
+            raise NotFound(f"{path} absent des fixtures")
+        return j
+
+    def get(self, path: str, params: dict):
+        path = path.rstrip("/") or "/"
+        if path == "/status":
+            return self.status()
+        if path == "/block":
+            return self.block(int(params["height"]))
+        if path == "/blockchain":
+            return self.blockchain(int(params["minHeight"]), int(params["maxHeight"]))
+        if path.startswith("/cosmos/tx/v1beta1/txs/block/"):
+            offset = int(params.get("pagination.offset", 0))
+            limit = int(params.get("pagination.limit", 100))
+            return self.lcd_block(int(path.rsplit("/", 1)[1]), offset, limit)
+        if path.startswith("/cosmos/tx/v1beta1/txs/"):
+            return self.tx(path.rsplit("/", 1)[1])
+        return self.other(path, params)
+
+    def jsonrpc(self, call: dict) -> dict:
+        """One JSON-RPC call, answered as the equivalent GET route."""
+        method = call.get("method")
+        params = {k: str(v) for k, v in (call.get("params") or {}).items()}
+        out = {"jsonrpc": "2.0", "id": call.get("id")}
+        try:
+            out["result"] = self.get("/" + method, params)["result"]
+        except Exception as e:
+            out["error"] = {"code": -32603, "message": "Internal error", "data": str(e)}
+        return out
+
+
+# ------------------------------------------------------------
+# HTTP server
+# ------------------------------------------------------------
+
+class Throttle:
+    """Per-route latency (longest matching path prefix) and an optional bandwidth cap."""
+
+    def __init__(self, latency: float = 0.0, route_latency: dict = None, bandwidth: float = 0.0):
+        self.latency = latency
+        self.route_latency = sorted((route_latency or {}).items(), key=lambda kv: -len(kv[0]))
+        self.bandwidth = bandwidth
+
+    def delay(self, path: str) -> float:
+        for prefix, seconds in self.route_latency:
+            if path.startswith(prefix):
+                return seconds
+        return self.latency
+
+class Fault:
+    """
+    One failure mode, injected on paths starting with `prefix` with probability `rate` while
+    its schedule is active: from `start` s after the server starts, during the first `duty`
+    fraction of every `period` s (period 0 = always).
+    """
+
+    def __init__(self, kind: str, rate: float = 1.0, prefix: str = None, period: float = 0.0,
+                 duty: float = 1.0, start: float = 0.0, **params):
+        if kind not in FAULT_DEFAULTS:
+            raise ValueError(f"type de panne inconnu: {kind} (attendu: {', '.join(FAULT_DEFAULTS)})")
+        unknown = set(params) - set(FAULT_DEFAULTS[kind])
+        if unknown:
+            raise ValueError(f"paramètres inconnus pour {kind}: {', '.join(sorted(unknown))}")
+        self.kind = kind
+        self.rate = rate
+        self.prefix = prefix if prefix is not None else (TX_ROUTE if kind == "tx404" else "/")
+        self.period = period
+        self.duty = duty
+        self.start = start
+        self.params = dict(FAULT_DEFAULTS[kind], **params)
+
+    def active(self, elapsed: float) -> bool:
+        if elapsed < self.start:
+            return False
+        return not self.period or (elapsed - self.start) % self.period < self.duty * self.period
+
+def parse_fault(spec: str) -> Fault:
+    """'KIND[:key=value,...]', e.g. '429:rate=0.2,period=60,duty=0.25' or 'slow:prefix=/block,seconds=3'."""
+    kind, _, rest = spec.partition(":")
+    kwargs = {}
+    for item in filter(None, rest.split(",")):
+        k, v = item.split("=", 1)
+        kwargs[k] = v if k == "prefix" else float(v)
+    return Fault(kind, **kwargs)
+
+class Faults:
+    """Seeded, thread-safe fault schedule of one server; counts what it injected per kind."""
+
+    def __init__(self, faults=(), seed: int = 0):
+        self.faults = list(faults)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.t0 = time.monotonic()
+        self.first_seen = OrderedDict()   # tx path -> 1re demande (tx404), au plus TX404_SEEN_MAX
+        self.injected = {}
+
+    def pick(self, path: str):
+        """The fault to inject on this request, or None."""
+        if not self.faults:
+            return None
+        now = time.monotonic()
+        with self.lock:
+            for f in self.faults:
+                if not path.startswith(f.prefix) or not f.active(now - self.t0):
+                    continue
+                if f.kind == "tx404":
+                    if path.startswith(TX_ROUTE + "block/"):
+                        continue
+                    first = self.first_seen.setdefault(path, now)
+                    if len(self.first_seen) > TX404_SEEN_MAX:
+                        self.first_seen.popitem(last=False)
+                    if now - first >= f.params["seconds"]:
+                        continue
+                if self.rng.random() < f.rate:
+                    self.injected[f.kind] = self.injected.get(f.kind, 0) + 1
+                    return f
+        return None
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return dict(self.injected)
+
+class RequestStats:
+    """HTTP requests, RPC calls (each call of a batch counts) and response bytes served."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.calls = 0
+            self.bytes_out = 0
+
+    def add(self, calls: int = 0, nbytes: int = 0, requests: int = 0):
+        with self.lock:
+            self.requests += requests
+            self.calls += calls
+            self.bytes_out += nbytes
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"requests": self.requests, "calls": self.calls, "bytes_out": self.bytes_out}
+
+def make_handler(resolver: Resolver, throttle: Throttle, stats: RequestStats, faults: Faults):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, obj, code: int = 200, headers: dict = None, keep: float = 1.0):
+            data = fast_json.dumps(obj)
+            if keep < 1.0:
+                data = data[:int(len(data) * keep)]
+            stats.add(nbytes=len(data))
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            if not throttle.bandwidth:
+                self.wfile.write(data)
+                return
+            for i in range(0, len(data), WRITE_CHUNK):
+                chunk = data[i:i + WRITE_CHUNK]
+                self.wfile.write(chunk)
+                time.sleep(len(chunk) / throttle.bandwidth)
+
+        def reset(self):
+            # SO_LINGER 0 : close() envoie un RST au lieu d'un FIN
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            self.close_connection = True
+            try:
+                self.connection.close()
+            except OSError:
+                pass
+
+        def inject(self, path: str) -> float:
+            """
+            Apply the fault picked for this request. Returns the fraction of the body to send
+            (1.0 = normal response), or 0.0 once the request has been answered or dropped.
+            """
+            f = faults.pick(path)
+            if f is None:
+                return 1.0
+            if f.kind == "slow":
+                time.sleep(f.params["seconds"])
+                return 1.0
+            if f.kind == "truncate":
+                return f.params["keep"]
+            if f.kind == "reset":
+                self.reset()
+            elif f.kind == "429":
+                wait = f.params["retry_after"]
+                self.reply({"code": 8, "message": "rate limited (injected)"}, 429,
+                           {"Retry-After": f"{wait:g}"} if wait else None)
+            elif f.kind == "5xx":
+                self.reply({"error": "injected failure"}, int(f.params["status"]))
+            elif f.kind == "tx404":
+                self.reply({"code": 5, "message": "tx not found (injected: not indexed yet)"}, 404)
+            return 0.0
+
+        def do_GET(self):
+            u = urlsplit(self.path)
+            stats.add(calls=1, requests=1)
+            time.sleep(throttle.delay(u.path))
+            keep = self.inject(u.path)
+            if not keep:
+                return
+            try:
+                self.reply(resolver.get(u.path, dict(parse_qsl(u.query))), keep=keep)
+            except NotFound as e:
+                code = 404 if u.path.startswith("/cosmos/") else 500
+                self.reply({"code": 5, "message": str(e)} if code == 404 else
+                           {"jsonrpc": "2.0", "id": -1, "error": {"code": -32603, "message": str(e)}}, code)
+            except Exception as e:
+                self.reply({"error": str(e)}, 502)
+
+        def do_POST(self):
+            path = urlsplit(self.path).path
+            time.sleep(throttle.delay(path))
+            body = fast_json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+            stats.add(calls=len(body) if isinstance(body, list) else 1, requests=1)
+            keep = self.inject(path)
+            if not keep:
+                return
+            if isinstance(body, list):
+                self.reply([resolver.jsonrpc(c) for c in body], keep=keep)
+            else:
+                self.reply(resolver.jsonrpc(body), keep=keep)
+
+    return Handler
+
+def serve(store: FixtureStore, host: str = HOST, port: int = PORT, record: bool = False, throttle: Throttle = None,
+          faults: Faults = None):
+    """ThreadingHTTPServer (not started); `server.stats` counts what it served, `server.faults` what it broke."""
+    stats = RequestStats()
+    faults = faults or Faults()
+    server = ThreadingHTTPServer((host, port), make_handler(Resolver(store, record), throttle or Throttle(), stats, faults))
+    server.daemon_threads = True
+    server.stats = stats
+    server.faults = faults
+    return server
+
+
+def main():
+    # python standin_server.py [--record] [--fixtures DIR] [--latency 0.05] [--route-latency /block=0.2] [--bandwidth 2e6]
+    #                          [--fault 429:rate=0.1] [--fault reset:period=60,duty=0.25]
+    # puis : HUB_STANDIN_URL=http://127.0.0.1:8765 python hub_fee_monitor_v41.py
+    ap = argparse.ArgumentParser(description="Serveur RPC/LCD/prix local rejouant des fixtures enregistrées")
+    ap.add_argument("--fixtures", default=FIXTURES_DIR)
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--record", action="store_true", help="les requêtes absentes des fixtures sont relayées aux vrais endpoints puis enregistrées")
+    ap.add_argument("--latency", type=float, default=0.0, help="latence ajoutée à chaque requête (s)")
+    ap.add_argument("--route-latency", action="append", default=[], metavar="PREFIX=SECONDS",
+                    help="latence pour les chemins commençant par PREFIX (répétable)")
+    ap.add_argument("--bandwidth", type=float, default=0.0, help="débit max par réponse (octets/s, 0 = illimité)")
+    ap.add_argument("--fault", action="append", default=[], metavar="KIND[:key=value,...]",
+                    help=f"panne injectée (répétable), KIND parmi {', '.join(FAULT_DEFAULTS)} ; "
+                         "clés: rate, prefix, period, duty, start + paramètres du type")
+    ap.add_argument("--fault-seed", type=int, default=0)
+    args = ap.parse_args()
+
+    route_latency = {}
+    for spec in args.route_latency:
+        prefix, seconds = spec.rsplit("=", 1)
+        route_latency[prefix] = float(seconds)
+
+    server = serve(FixtureStore(args.fixtures), args.host, args.port, args.record,
+                   Throttle(args.latency, route_latency, args.bandwidth),
+                   Faults([parse_fault(f) for f in args.fault], args.fault_seed))
+    mode = "enregistrement" if args.record else "replay"
+    print(f"Stand-in ({mode}, fixtures: {args.fixtures}) sur http://{args.host}:{args.port}")
+    print(f"  -> HUB_STANDIN_URL=http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nArrêt.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
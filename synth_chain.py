@@ -0,0 +1,425 @@
+import argparse
+import base64
+import hashlib
+import math
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# ------------------------------------------------------------
+# CONFIG
+# ------------------------------------------------------------
+
+SEED = 42
+START_TIME = "2024-03-01T23:00:00Z"   # bloc 1 ; 1 000 blocs suffisent à franchir minuit
+BLOCK_SECONDS = 6.0                   # intervalle moyen
+BLOCK_JITTER = 2.0                    # intervalles de BLOCK_SECONDS - JITTER/2 à + JITTER/2
+MEAN_TXS = 10                         # txs moyens par bloc
+DAILY_SWING = 0.5                     # charge ±50% selon l'heure UTC (pic vers 15h)
+
+IBC_SHARE = 0.35                      # part des txs contenant au moins un message /ibc.*
+NON_UATOM_FEE_SHARE = 0.03            # fee payée uniquement dans un autre denom (fee_uatom = 0)
+MIXED_FEE_SHARE = 0.02                # uatom + autre denom
+TEMPLATES = 512                       # squelettes de txs pré-encodés (seul le memo varie par tx)
+
+SIGNATURES = 180                      # last_commit de taille réaliste (validateurs Hub)
+ATOM_PRICE = 10.0                     # prix servi pour CoinGecko et utilisé dans le CSV attendu
+HASH_INDEX_MAX = 2_000_000            # hash -> (hauteur, index) gardés pour servir tx-by-hash
+
+OTHER_FEE_DENOM = "ibc/C4CFF46FD6DE35CA4CF4CE031E643C8FDC9BA4B99AE598E9B0ED98FE3A2319F9"
+
+
+# ------------------------------------------------------------
+# Protobuf encoding
+# ------------------------------------------------------------
+
+def varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+def ld(field: int, payload: bytes) -> bytes:
+    """Length-delimited field."""
+    return varint((field << 3) | 2) + varint(len(payload)) + payload
+
+def vi(field: int, n: int) -> bytes:
+    """Varint field."""
+    return varint(field << 3) + varint(n)
+
+def coin(denom: str, amount: int) -> bytes:
+    return ld(1, denom.encode()) + ld(2, str(amount).encode())
+
+def bech32ish(rng: random.Random, prefix: str = "cosmos1") -> str:
+    return prefix + "".join(rng.choice("023456789acdefghjklmnpqrstuvwxyz") for _ in range(38))
+
+
+# ------------------------------------------------------------
+# Messages (type_url, protobuf value, LCD JSON)
+# ------------------------------------------------------------
+
+def msg_send(rng):
+    src, dst, amount = bech32ish(rng), bech32ish(rng), rng.randint(1, 10 ** 9)
+    value = ld(1, src.encode()) + ld(2, dst.encode()) + ld(3, coin("uatom", amount))
+    return "/cosmos.bank.v1beta1.MsgSend", value, {
+        "from_address": src, "to_address": dst, "amount": [{"denom": "uatom", "amount": str(amount)}]}
+
+def msg_delegate(rng):
+    delegator, validator, amount = bech32ish(rng), bech32ish(rng, "cosmosvaloper1"), rng.randint(10 ** 5, 10 ** 10)
+    value = ld(1, delegator.encode()) + ld(2, validator.encode()) + ld(3, coin("uatom", amount))
+    return "/cosmos.staking.v1beta1.MsgDelegate", value, {
+        "delegator_address": delegator, "validator_address": validator,
+        "amount": {"denom": "uatom", "amount": str(amount)}}
+
+def msg_withdraw_rewards(rng):
+    delegator, validator = bech32ish(rng), bech32ish(rng, "cosmosvaloper1")
+    value = ld(1, delegator.encode()) + ld(2, validator.encode())
+    return "/cosmos.distribution.v1beta1.MsgWithdrawDelegatorReward", value, {
+        "delegator_address": delegator, "validator_address": validator}
+
+def msg_transfer(rng):
+    channel, sender, receiver = f"channel-{rng.randint(0, 800)}", bech32ish(rng), bech32ish(rng, "osmo1")
+    amount, timeout = rng.randint(1, 10 ** 9), 1_700_000_000_000_000_000 + rng.randint(0, 10 ** 12)
+    value = (ld(1, b"transfer") + ld(2, channel.encode()) + ld(3, coin("uatom", amount))
+             + ld(4, sender.encode()) + ld(5, receiver.encode()) + vi(7, timeout))
+    return "/ibc.applications.transfer.v1.MsgTransfer", value, {
+        "source_port": "transfer", "source_channel": channel,
+        "token": {"denom": "uatom", "amount": str(amount)},
+        "sender": sender, "receiver": receiver, "timeout_timestamp": str(timeout)}
+
+def msg_update_client(rng):
+    client_id, signer = f"07-tendermint-{rng.randint(0, 1200)}", bech32ish(rng)
+    header = rng.randbytes(rng.randint(1500, 4000))   # header signé d'une autre chaîne, opaque ici
+    value = ld(1, client_id.encode()) + ld(2, ld(1, b"/ibc.lightclients.tendermint.v1.Header") + ld(2, header)) + ld(3, signer.encode())
+    return "/ibc.core.client.v1.MsgUpdateClient", value, {"client_id": client_id, "signer": signer}
+
+def msg_recv_packet(rng):
+    sequence, signer = rng.randint(1, 10 ** 7), bech32ish(rng)
+    packet = vi(1, sequence) + ld(2, b"transfer") + ld(3, f"channel-{rng.randint(0, 800)}".encode()) + ld(6, rng.randbytes(200))
+    value = ld(1, packet) + ld(2, rng.randbytes(300)) + ld(4, signer.encode())
+    return "/ibc.core.channel.v1.MsgRecvPacket", value, {"packet": {"sequence": str(sequence)}, "signer": signer}
+
+def msg_acknowledgement(rng):
+    sequence, signer = rng.randint(1, 10 ** 7), bech32ish(rng)
+    value = ld(1, vi(1, sequence)) + ld(2, b'{"result":"AQ=="}') + ld(3, rng.randbytes(300)) + ld(5, signer.encode())
+    return "/ibc.core.channel.v1.MsgAcknowledgement", value, {"packet": {"sequence": str(sequence)}, "signer": signer}
+
+# (poids, messages) : relayeurs = update client + paquet, comme sur le Hub
+IBC_TXS = [
+    (0.45, [msg_transfer]),
+    (0.35, [msg_update_client, msg_recv_packet]),
+    (0.20, [msg_update_client, msg_acknowledgement]),
+]
+OTHER_TXS = [
+    (0.45, [msg_send]),
+    (0.25, [msg_delegate]),
+    (0.20, [msg_withdraw_rewards, msg_withdraw_rewards]),
+    (0.10, [msg_withdraw_rewards, msg_delegate]),
+]
+
+
+# ------------------------------------------------------------
+# Tx templates
+# ------------------------------------------------------------
+#
+# A template is a fully encoded tx except for its memo: TxRaw{body, auth_info, signatures} where
+# body = messages + memo. Each tx of the chain is a template plus a memo naming its (height, index),
+# so all tx bytes and hashes are distinct while encoding one costs a few concatenations.
+
+class TxTemplate:
+    def __init__(self, rng: random.Random, ibc: bool):
+        weights, kinds = zip(*(IBC_TXS if ibc else OTHER_TXS))
+        msgs = [make(rng) for make in rng.choices(kinds, weights)[0]]
+        self.ibc = ibc
+        self.messages = b"".join(ld(1, ld(1, t.encode()) + ld(2, v)) for t, v, _j in msgs)
+        self.messages_json = [dict(j, **{"@type": t}) for t, _v, j in msgs]
+
+        gas = rng.randint(80_000, 400_000 * len(msgs))
+        r = rng.random()
+        if r < NON_UATOM_FEE_SHARE:
+            coins = [(OTHER_FEE_DENOM, rng.randint(100, 50_000))]
+        elif r < NON_UATOM_FEE_SHARE + MIXED_FEE_SHARE:
+            coins = [("uatom", gas // 40 + rng.randint(0, 2000)), (OTHER_FEE_DENOM, rng.randint(100, 50_000))]
+        else:
+            coins = [("uatom", gas // 40 + rng.randint(0, 2000))]
+        self.fee_uatom = sum(a for d, a in coins if d == "uatom")
+
+        pubkey = b"\x02" + rng.randbytes(32)
+        sequence = rng.randint(0, 50_000)
+        signer = ld(1, ld(1, b"/cosmos.crypto.secp256k1.PubKey") + ld(2, ld(1, pubkey))) + ld(2, ld(1, vi(1, 1))) + vi(3, sequence)
+        fee = b"".join(ld(1, coin(d, a)) for d, a in coins) + vi(2, gas)
+        self.auth_info = ld(2, ld(1, signer) + ld(2, fee))
+        signature = rng.randbytes(64)
+        self.signatures = ld(3, signature)
+        self.auth_json = {
+            "signer_infos": [{
+                "public_key": {"@type": "/cosmos.crypto.secp256k1.PubKey", "key": base64.b64encode(pubkey).decode("ascii")},
+                "mode_info": {"single": {"mode": "SIGN_MODE_DIRECT"}},
+                "sequence": str(sequence),
+            }],
+            "fee": {"amount": [{"denom": d, "amount": str(a)} for d, a in coins], "gas_limit": str(gas), "payer": "", "granter": ""},
+        }
+        self.signatures_json = [base64.b64encode(signature).decode("ascii")]
+
+    def raw(self, memo: bytes) -> bytes:
+        return ld(1, self.messages + ld(2, memo)) + self.auth_info + self.signatures
+
+    def lcd_tx(self, memo: str) -> dict:
+        return {
+            "body": {"messages": self.messages_json, "memo": memo, "timeout_height": "0",
+                     "extension_options": [], "non_critical_extension_options": []},
+            "auth_info": self.auth_json,
+            "signatures": self.signatures_json,
+        }
+
+
+# ------------------------------------------------------------
+# Chain
+# ------------------------------------------------------------
+
+def tx_hash(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest().upper()
+
+def memo_for(height: int, index: int) -> str:
+    return f"synth {height}-{index}"
+
+class SyntheticChain:
+    """
+    Deterministic chain of n_blocks: every block is derived from (seed, height) alone, so any
+    height can be produced in any order without generating the ones before it.
+    Also usable as a standin_server store (same get(kind, key) as FixtureStore).
+    """
+
+    def __init__(self, n_blocks: int, mean_txs: float = MEAN_TXS, ibc_share: float = IBC_SHARE,
+                 seed: int = SEED, start: str = START_TIME):
+        self.n_blocks = n_blocks
+        self.mean_txs = mean_txs
+        self.ibc_share = ibc_share
+        self.seed = seed
+        self.start_ns = int(datetime.fromisoformat(start.replace("Z", "+00:00")).timestamp()) * 10 ** 9
+
+        rng = random.Random(seed)
+        n_ibc = TEMPLATES // 2
+        self.ibc_templates = [TxTemplate(rng, True) for _ in range(n_ibc)]
+        self.other_templates = [TxTemplate(rng, False) for _ in range(TEMPLATES - n_ibc)]
+        self.templates = self.ibc_templates + self.other_templates
+        self.signatures = [{
+            "block_id_flag": 2,
+            "validator_address": rng.randbytes(20).hex().upper(),
+            "signature": base64.b64encode(rng.randbytes(64)).decode("ascii"),
+        } for _ in range(SIGNATURES)]
+
+        self.lock = threading.Lock()
+        self.hash_index = OrderedDict()   # rempli au fil des blocs servis
+
+    # --- block layout (no encoding) ---
+
+    def block_layout(self, height: int):
+        """(time_ns, [template index per tx]) of a height."""
+        rng = random.Random(self.seed * 1_000_003 + height)
+        jitter = int((rng.random() - 0.5) * BLOCK_JITTER * 1e9)
+        t_ns = self.start_ns + int((height - 1) * BLOCK_SECONDS * 1e9) + jitter
+        hour = (t_ns // 10 ** 9 % 86400) / 3600
+        mean = self.mean_txs * (1 + DAILY_SWING * math.sin((hour - 9) / 24 * 2 * math.pi))
+        n = rng.randint(0, max(0, round(2 * mean)))
+        n_ibc = len(self.ibc_templates)
+        out = []
+        for _ in range(n):
+            if rng.random() < self.ibc_share:
+                out.append(rng.randrange(n_ibc))
+            else:
+                out.append(n_ibc + rng.randrange(len(self.other_templates)))
+        return t_ns, out
+
+    @staticmethod
+    def time_iso(t_ns: int) -> str:
+        secs, ns = divmod(t_ns, 10 ** 9)
+        return datetime.fromtimestamp(secs, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S") + f".{ns:09d}Z"
+
+    @staticmethod
+    def date_of(t_ns: int) -> str:
+        return str(datetime.fromtimestamp(t_ns // 10 ** 9, timezone.utc).date())
+
+    # --- encoded data ---
+
+    def block_txs(self, height: int):
+        """(time_iso, [(raw bytes, template)]) of a height."""
+        t_ns, layout = self.block_layout(height)
+        txs = [(self.templates[k].raw(memo_for(height, i).encode()), self.templates[k]) for i, k in enumerate(layout)]
+        return self.time_iso(t_ns), txs
+
+    def block_response(self, height: int) -> dict:
+        time_iso, txs = self.block_txs(height)
+        self.index_hashes(height, [raw for raw, _t in txs])
+        sigs = [dict(s, timestamp=time_iso) for s in self.signatures]
+        return {"jsonrpc": "2.0", "id": -1, "result": {
+            "block_id": {"hash": hashlib.sha256(str(height).encode()).hexdigest().upper()},
+            "block": {
+                "header": {"chain_id": "cosmoshub-4", "height": str(height), "time": time_iso},
+                "data": {"txs": [base64.b64encode(raw).decode("ascii") for raw, _t in txs]},
+                "evidence": {"evidence": []},
+                "last_commit": {"height": str(height - 1), "round": 0, "signatures": sigs},
+            },
+        }}
+
+    def block_meta(self, height: int) -> dict:
+        t_ns, layout = self.block_layout(height)
+        return {
+            "block_id": {"hash": hashlib.sha256(str(height).encode()).hexdigest().upper()},
+            "header": {"chain_id": "cosmoshub-4", "height": str(height), "time": self.time_iso(t_ns)},
+            "num_txs": str(len(layout)),
+        }
+
+    def tx_response(self, height: int, index: int) -> dict:
+        """LCD /cosmos/tx/v1beta1/txs/{hash} body of one tx."""
+        t_ns, layout = self.block_layout(height)
+        tmpl = self.templates[layout[index]]
+        memo = memo_for(height, index)
+        tx = tmpl.lcd_tx(memo)
+        return {"tx": tx, "tx_response": {
+            "height": str(height), "txhash": tx_hash(tmpl.raw(memo.encode())), "code": 0,
+            "timestamp": self.time_iso(t_ns)[:19] + "Z", "tx": dict(tx, **{"@type": "/cosmos.tx.v1beta1.Tx"}),
+        }}
+
+    def index_hashes(self, height: int, raws: list):
+        with self.lock:
+            for i, raw in enumerate(raws):
+                self.hash_index[tx_hash(raw)] = (height, i)
+            while len(self.hash_index) > HASH_INDEX_MAX:
+                self.hash_index.popitem(last=False)
+
+    # --- expected aggregates ---
+
+    def expected_by_date(self, first: int = 1, last: int = None) -> dict:
+        """by_date exactly as the scanner must build it over first..last (no encoding involved)."""
+        import hub_fee_monitor_v41 as hub
+        by_date = {}
+        for h in range(first, (last or self.n_blocks) + 1):
+            t_ns, layout = self.block_layout(h)
+            day = by_date.setdefault(self.date_of(t_ns), hub.new_day_stats())
+            day["tx_total"] += len(layout)
+            for k in layout:
+                tmpl = self.templates[k]
+                hub.add_tx(day, tmpl.fee_uatom, tmpl.ibc)
+        return by_date
+
+    # --- standin_server store ---
+
+    def get(self, kind: str, key=None):
+        if kind == "status":
+            t_ns, _ = self.block_layout(self.n_blocks)
+            return {"jsonrpc": "2.0", "id": -1, "result": {"sync_info": {
+                "latest_block_height": str(self.n_blocks),
+                "latest_block_time": self.time_iso(t_ns),
+                "earliest_block_height": "1",
+            }}}
+        if kind == "route":
+            return {"cosmos": {"usd": ATOM_PRICE}}
+        if kind == "tx":
+            with self.lock:
+                loc = self.hash_index.get(key)
+            return None if loc is None else self.tx_response(*loc)
+        h = int(key)
+        if not 1 <= h <= self.n_blocks:
+            return None
+        if kind == "block":
+            return self.block_response(h)
+        if kind == "meta":
+            return self.block_meta(h)
+        if kind == "lcdblock":
+            _t, layout = self.block_layout(h)
+            return {"txs": [self.tx_response(h, i)["tx"] for i in range(len(layout))], "block": None}
+        return None
+
+
+# ------------------------------------------------------------
+# Output
+# ------------------------------------------------------------
+
+def write_expected_csv(chain: SyntheticChain, path: str):
+    """hub_revenue_daily.csv the scanner must produce for the whole chain, at ATOM_PRICE."""
+    import hub_fee_monitor_v41 as hub
+    if os.path.exists(path):
+        os.remove(path)
+    outfile = hub.OUTFILE
+    hub.OUTFILE = path
+    try:
+        return hub.write_daily_csv(chain.expected_by_date(), ATOM_PRICE)
+    finally:
+        hub.OUTFILE = outfile
+
+def write_fixtures(chain: SyntheticChain, root: str, tx_json: bool = True):
+    """The chain as standin_server fixtures (status, blocks, metas, txs by hash, price)."""
+    from standin_server import FixtureStore, route_key
+    store = FixtureStore(root)
+    store.put("status", None, chain.get("status"))
+    store.put("route", route_key("/api/v3/simple/price", {"ids": "cosmos", "vs_currencies": "usd"}), chain.get("route"))
+    n_txs = 0
+    t0 = time.monotonic()
+    for h in range(1, chain.n_blocks + 1):
+        block = chain.block_response(h)
+        store.put("block", h, block)
+        store.put("meta", h, chain.block_meta(h))
+        txs = block["result"]["block"]["data"]["txs"]
+        if tx_json:
+            for i, b64 in enumerate(txs):
+                r = chain.tx_response(h, i)
+                store.put("tx", r["tx_response"]["txhash"], r)
+        n_txs += len(txs)
+        if h % 10_000 == 0:
+            print(f"  {h}/{chain.n_blocks} blocs, {n_txs} txs ({time.monotonic() - t0:.0f} s)")
+    return n_txs
+
+
+def main():
+    # python synth_chain.py expected --blocks 1000000 --out expected.csv    (agrégats seuls, rapide)
+    # python synth_chain.py write fixtures/ --blocks 20000                   (fixtures standin_server + CSV attendu)
+    # python synth_chain.py serve --blocks 1000000                            (chaîne servie à la volée)
+    ap = argparse.ArgumentParser(description="Chaîne Cosmos synthétique déterministe")
+    ap.add_argument("command", choices=["expected", "write", "serve"])
+    ap.add_argument("directory", nargs="?", default="fixtures")
+    ap.add_argument("--blocks", type=int, default=15_000)
+    ap.add_argument("--mean-txs", type=float, default=MEAN_TXS)
+    ap.add_argument("--ibc-share", type=float, default=IBC_SHARE)
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--start", default=START_TIME)
+    ap.add_argument("--out", default="expected_hub_revenue_daily.csv")
+    ap.add_argument("--no-tx-json", action="store_true", help="write : pas de fichier tx-by-hash par tx")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.0)
+    args = ap.parse_args()
+
+    chain = SyntheticChain(args.blocks, args.mean_txs, args.ibc_share, args.seed, args.start)
+
+    if args.command == "expected":
+        df = write_expected_csv(chain, args.out)
+        print(df.to_string(index=False))
+        print(f"\nCSV attendu -> {args.out}")
+    elif args.command == "write":
+        n_txs = write_fixtures(chain, args.directory, tx_json=not args.no_tx_json)
+        expected = os.path.join(args.directory, os.path.basename(args.out))
+        write_expected_csv(chain, expected)
+        print(f"{args.blocks} blocs, {n_txs} txs -> {args.directory} (CSV attendu: {expected})")
+    else:
+        import standin_server
+        server = standin_server.serve(chain, port=args.port, throttle=standin_server.Throttle(args.latency))
+        print(f"Chaîne synthétique ({args.blocks} blocs) sur http://127.0.0.1:{args.port}")
+        print(f"  -> HUB_STANDIN_URL=http://127.0.0.1:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\nArrêt.")
+        finally:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import pytest
+
+from height_ranges import HeightRanges
+
+backfill = pytest.importorskip("backfill")
+
+# jour de 10 hauteurs, 100..109, 3 txs chacune
+FIRST = 100
+COUNTS = [3] * 10
+
+
+def test_complete_day_needs_nothing():
+    assert backfill.missing_parts(FIRST, COUNTS, 30, HeightRanges()) == []
+
+
+def test_row_backed_by_state_schedules_the_other_heights():
+    done = HeightRanges([(103, 105)])
+    assert backfill.missing_parts(FIRST, COUNTS, 9, done) == [(100, 102), (106, 109)]
+
+
+def test_row_not_backed_by_state_goes_to_manual_review():
+    # 9 tx = préfixe 100..102 par coïncidence ; le state ne dit rien de ce jour
+    assert isinstance(backfill.missing_parts(FIRST, COUNTS, 9, HeightRanges([(50, 50)])), str)
+    # state qui ne couvre qu'une partie de la ligne
+    assert isinstance(backfill.missing_parts(FIRST, COUNTS, 9, HeightRanges([(100, 101)])), str)
+
+
+def test_row_above_expected_is_flagged():
+    assert "double" in backfill.missing_parts(FIRST, COUNTS, 31, HeightRanges())
+
+
+# ------------------------------------------------------------
+# CSV rows not accounted for by the state file
+# ------------------------------------------------------------
+
+DAY0 = 1_709_251_200   # 2024-03-01T00:00:00Z
+BLOCKS_PER_DAY = 144   # un bloc toutes les 10 minutes, 2 txs chacun
+LATEST = 5 * BLOCKS_PER_DAY
+
+
+@pytest.fixture
+def chain(tmp_path, monkeypatch):
+    hub = backfill.hub
+    monkeypatch.chdir(tmp_path)
+
+    def metas(lo, hi, deadline=None):
+        return [(h, DAY0 + (h - 1) * 600, 2) for h in range(lo, min(hi, LATEST) + 1)]
+
+    monkeypatch.setattr(hub, "rpc_status", lambda: (
+        {"result": {"sync_info": {"earliest_block_height": "1", "latest_block_height": str(LATEST)}}}, None))
+    monkeypatch.setattr(hub, "rpc_block_metas", metas)
+    monkeypatch.setattr(hub, "rpc_chunk_metas", lambda chunk: {h: (t, n) for h, t, n in metas(chunk[0], chunk[-1])})
+    return hub
+
+def write_csv(hub, rows: dict):
+    with open(hub.OUTFILE, "w", encoding="utf-8") as f:
+        f.write("date,tx_total\n" + "".join(f"{d},{n}\n" for d, n in rows.items()))
+
+
+def test_rows_from_older_runs_refuse_a_raw_backfill(chain):
+    # ligne d'une fenêtre de 30 blocs en milieu de journée, state hérité [[h, h]]
+    write_csv(chain, {"2024-03-02": 60})
+    chain.mark_done([(700, 700)])
+    assert backfill.unbacked_rows([(100, 300)]) == ["2024-03-02"]
+    with pytest.raises(RuntimeError):
+        backfill.backfill([(100, 300)])
+
+
+def test_rows_backed_by_the_state_allow_a_backfill(chain):
+    day2 = BLOCKS_PER_DAY + 1
+    write_csv(chain, {"2024-03-02": 60})
+    chain.mark_done([(day2 + 40, day2 + 69)])
+    assert backfill.unbacked_rows([(day2, day2 + 39)]) == []
+    assert backfill.unbacked_rows([(1, 100)]) == []
@@ -0,0 +1,77 @@
+import base64
+import hashlib
+
+import pytest
+
+import cosmos_tx_proto as proto
+from synth_chain import SyntheticChain, coin, ld, vi
+
+
+def any_msg(type_url: str, value: bytes = b"") -> bytes:
+    return ld(1, ld(1, type_url.encode()) + ld(2, value))
+
+def tx_raw(messages: list, coins: list, memo: bytes = b"") -> bytes:
+    """TxRaw{body, auth_info{fee{amount, gas_limit}}, signatures}."""
+    body = b"".join(any_msg(t) for t in messages) + ld(2, memo)
+    fee = b"".join(ld(1, coin(d, a)) for d, a in coins) + vi(2, 200_000)
+    auth_info = ld(1, b"signer") + ld(2, fee)
+    return ld(1, body) + ld(2, auth_info) + ld(3, b"\x00" * 64)
+
+
+def test_fee_sums_uatom_coins_only():
+    raw = tx_raw(["/cosmos.bank.v1beta1.MsgSend"], [("uatom", 2500), ("ibc/ABC", 99), ("uatom", 500)])
+    assert proto.decode_tx_summary(raw) == (3000, False)
+
+
+def test_fee_without_uatom_is_zero():
+    raw = tx_raw(["/cosmos.bank.v1beta1.MsgSend"], [("ibc/ABC", 99)])
+    assert proto.decode_tx_summary(raw) == (0, False)
+
+
+def test_ibc_detected_on_any_message():
+    raw = tx_raw(["/cosmos.bank.v1beta1.MsgSend", "/ibc.core.client.v1.MsgUpdateClient"], [("uatom", 1)])
+    body, _auth = proto.split_tx_raw(raw)
+    assert proto.msg_type_urls_from_body(body) == ["/cosmos.bank.v1beta1.MsgSend", "/ibc.core.client.v1.MsgUpdateClient"]
+    assert proto.decode_tx_summary(raw) == (1, True)
+
+
+def test_large_varint_amount():
+    raw = tx_raw(["/cosmos.bank.v1beta1.MsgSend"], [("uatom", 10 ** 15)], memo=b"m" * 300)
+    assert proto.decode_tx_summary(raw) == (10 ** 15, False)
+
+
+def test_truncated_tx_raises():
+    raw = tx_raw(["/cosmos.bank.v1beta1.MsgSend"], [("uatom", 1)])
+    with pytest.raises((ValueError, IndexError)):
+        proto.decode_tx_summary(raw[:-10])
+
+
+def test_tx_without_auth_info_raises():
+    with pytest.raises(ValueError):
+        proto.decode_tx_summary(ld(1, any_msg("/cosmos.bank.v1beta1.MsgSend")))
+
+
+def test_matches_lcd_decoding_on_synthetic_chain():
+    hub = pytest.importorskip("hub_fee_monitor_v41")
+    chain = SyntheticChain(50, mean_txs=8, seed=5)
+    n = 0
+    for h in range(1, 51):
+        _time, txs = chain.block_txs(h)
+        for i, (raw, _tmpl) in enumerate(txs):
+            assert proto.decode_tx_summary(raw) == hub.summary_from_lcd_tx(chain.tx_response(h, i))
+            n += 1
+    assert n > 0
+
+
+def test_batch_round_trip_flags_undecodable_txs():
+    good = [tx_raw(["/cosmos.bank.v1beta1.MsgSend"], [("uatom", 7)]),
+            tx_raw(["/ibc.applications.transfer.v1.MsgTransfer"], [("uatom", 9)])]
+    txs_b64 = [base64.b64encode(good[0]), base64.b64encode(b"\xff\xff"), base64.b64encode(good[1]).decode("ascii")]
+    blob = proto.pack_b64_batch(txs_b64)
+    assert proto.unpack_summaries(*proto.decode_b64_batch(blob)) == [(7, False), None, (9, True)]
+
+
+def test_batch_hashes_are_tendermint_tx_hashes():
+    raws = [tx_raw(["/cosmos.bank.v1beta1.MsgSend"], [("uatom", k)]) for k in (1, 2, 3)]
+    blob = proto.pack_b64_batch(base64.b64encode(r) for r in raws)
+    assert proto.unpack_hashes(proto.hash_b64_batch(blob)) == [hashlib.sha256(r).hexdigest().upper() for r in raws]
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+import fast_json
+from synth_chain import SyntheticChain
+
+
+@pytest.fixture(scope="module")
+def chain():
+    return SyntheticChain(20, mean_txs=6, seed=11)
+
+@pytest.fixture
+def always_slim(monkeypatch):
+    monkeypatch.setattr(fast_json, "SLIM_MIN_BYTES", 0)
+
+def block_body(chain, height: int, rid: int = -1, **dumps_kw) -> bytes:
+    return json.dumps(dict(chain.block_response(height), id=rid), **dumps_kw).encode()
+
+def expected(chain, height: int) -> dict:
+    block = chain.block_response(height)["result"]["block"]
+    return {"height": block["header"]["height"], "time": block["header"]["time"], "txs": block["data"]["txs"]}
+
+def as_read(block: dict) -> dict:
+    """Fields the scanner reads, txs as str whether the decoder returned bytes or str."""
+    txs = [t.decode("ascii") if isinstance(t, bytes) else t for t in block["data"]["txs"] or []]
+    return {"height": block["header"]["height"], "time": block["header"]["time"], "txs": txs}
+
+
+def test_slim_block_extracts_header_and_txs(chain):
+    for h in range(1, 21):
+        block, end = fast_json.slim_block(block_body(chain, h))
+        assert as_read(block) == expected(chain, h)
+        assert end > 0
+
+
+def test_slim_block_position_allows_scanning_on(chain):
+    body = block_body(chain, 3) + block_body(chain, 4)
+    first, pos = fast_json.slim_block(body)
+    second, _ = fast_json.slim_block(body, pos)
+    assert as_read(first) == expected(chain, 3)
+    assert as_read(second) == expected(chain, 4)
+
+
+def test_slim_block_null_and_empty_txs():
+    for txs in ("null", "[]"):
+        body = ('{"result":{"block":{"header":{"height":"7","time":"2024-03-02T00:00:00Z"},'
+                '"data":{"txs": %s},"last_commit":{}}}}' % txs).encode()
+        block, _ = fast_json.slim_block(body)
+        assert block == {"header": {"height": "7", "time": "2024-03-02T00:00:00Z"}, "data": {"txs": []}}
+
+
+def test_slim_block_rejects_escaped_tx():
+    body = b'{"header":{"height":"1","time":"t"},"data":{"txs":["ab\\/cd"]}}'
+    with pytest.raises(ValueError):
+        fast_json.slim_block(body)
+
+
+def test_small_response_is_parsed_in_full(chain):
+    body = block_body(chain, 5)
+    assert fast_json.decode_block_response(body) == fast_json.loads(body)
+
+
+def test_large_response_is_slimmed(chain, always_slim):
+    out = fast_json.decode_block_response(block_body(chain, 5))
+    assert set(out["result"]["block"]) == {"header", "data"}
+    assert as_read(out["result"]["block"]) == expected(chain, 5)
+
+
+def test_error_response_falls_back_to_full_parse(always_slim):
+    body = b'{"jsonrpc":"2.0","id":-1,"error":{"code":-32603,"message":"height 9 is not available"}}'
+    assert fast_json.decode_block_response(body) == json.loads(body)
+
+
+def test_unexpected_shape_falls_back_to_full_parse(always_slim):
+    body = b'{"jsonrpc":"2.0","id":-1,"result":{"block":{"header":{"height":"1","time":"t"},"data":{}}}}'
+    assert fast_json.decode_block_response(body) == json.loads(body)
+
+
+def test_batch_with_results_and_errors(chain, always_slim):
+    items = [dict(chain.block_response(1), id=0),
+             {"jsonrpc": "2.0", "id": 1, "error": {"code": -32603, "message": "height 2 is not available"}},
+             dict(chain.block_response(3), id=2)]
+    body = json.dumps(items).encode()   # séparateurs avec espaces, comme certains nodes
+    out = fast_json.decode_block_batch(body)
+    assert [item["id"] for item in out] == [0, 1, 2]
+    assert as_read(out[0]["result"]["block"]) == expected(chain, 1)
+    assert out[1] == {"id": 1, "error": "height 2 is not available"}
+    assert as_read(out[2]["result"]["block"]) == expected(chain, 3)
+
+
+def test_batch_that_cannot_be_scanned_is_parsed_in_full(always_slim):
+    body = b'[{"jsonrpc":"2.0","id":0,"result":{"block":{"header":{"height":"1"}}}}]'
+    assert fast_json.decode_block_batch(body) == json.loads(body)
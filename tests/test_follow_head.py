@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def hub(tmp_path, monkeypatch):
+    import hub_fee_monitor_v41
+    monkeypatch.chdir(tmp_path)
+    return hub_fee_monitor_v41
+
+
+def test_catch_up_skips_heights_already_done(hub, monkeypatch):
+    import follow_head
+
+    with open(hub.STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump({"done": [[100, 200], [250, 260]]}, f)
+    fetched = []
+
+    def fetch_chunk(chunk):
+        fetched.extend(chunk)
+        return {h: ("2024-03-02", []) for h in chunk}
+
+    monkeypatch.setattr(hub, "fetch_chunk", fetch_chunk)
+    follower = follow_head.HeadFollower()
+    follower.last = 150
+    assert follower.catch_up(300)
+    assert fetched == list(range(201, 250)) + list(range(261, 301))
+    assert follower.last == 300
+
+
+def test_flush_saves_state_before_csv(hub, monkeypatch):
+    import follow_head
+
+    seen = []
+    monkeypatch.setattr(hub, "get_atom_price_usd", lambda: 10.0)
+    monkeypatch.setattr(hub, "write_daily_csv", lambda by_date, price: seen.append(hub.load_state()["last_height"]))
+    follower = follow_head.HeadFollower()
+    follower.last, follower.saved = 120, 100
+    follower.by_date = {"2024-03-02": hub.new_day_stats()}
+    follower.maybe_flush(force=True)
+    assert seen == [120]
+    assert follower.by_date == {}
@@ -0,0 +1,145 @@
+import json
+import random
+
+import pytest
+
+from height_ranges import HeightRanges
+
+
+def test_add_single_height_and_range():
+    done = HeightRanges()
+    done.add(5)
+    done.add(10, 12)
+    assert done.ranges() == [[5, 5], [10, 12]]
+    assert 5 in done and 11 in done
+    assert 6 not in done and 13 not in done
+    assert done.count() == 4
+
+
+def test_add_merges_adjacent_ranges():
+    done = HeightRanges([(1, 3), (7, 9)])
+    done.add(4, 6)
+    assert done.ranges() == [[1, 9]]
+
+
+def test_add_merges_overlapping_ranges():
+    done = HeightRanges([(1, 5), (10, 15), (20, 25)])
+    done.add(4, 21)
+    assert done.ranges() == [[1, 25]]
+    done.add(2, 3)
+    assert done.ranges() == [[1, 25]]
+
+
+def test_add_rejects_empty_range():
+    with pytest.raises(ValueError):
+        HeightRanges().add(5, 4)
+
+
+def test_watermark_is_end_of_first_range():
+    assert HeightRanges().watermark() is None
+    done = HeightRanges([(100, 200), (300, 400)])
+    assert done.watermark() == 200
+    done.add(201, 299)
+    assert done.watermark() == 400
+
+
+def test_watermark_from_floor():
+    done = HeightRanges([(100, 200), (300, 400)])
+    assert done.watermark(floor=150) == 200
+    assert done.watermark(floor=300) == 400
+    assert done.watermark(floor=250) == 249
+    assert done.watermark(floor=50) == 49
+
+
+def test_missing():
+    done = HeightRanges([(10, 20), (30, 40)])
+    assert done.missing(1, 50) == [(1, 9), (21, 29), (41, 50)]
+    assert done.missing(12, 35) == [(21, 29)]
+    assert done.missing(10, 20) == []
+    assert HeightRanges().missing(3, 7) == [(3, 7)]
+
+
+def test_intersects():
+    done = HeightRanges([(10, 20), (30, 40)])
+    assert done.intersects(20, 25)
+    assert done.intersects(1, 10)
+    assert done.intersects(15, 35)
+    assert not done.intersects(21, 29)
+    assert not done.intersects(41, 100)
+    assert not HeightRanges().intersects(1, 100)
+
+
+def test_random_adds_match_a_plain_set():
+    rng = random.Random(3)
+    done = HeightRanges()
+    heights = set()
+    for _ in range(500):
+        lo = rng.randint(0, 1000)
+        hi = lo + rng.randint(0, 20)
+        done.add(lo, hi)
+        heights.update(range(lo, hi + 1))
+    assert done.count() == len(heights)
+    assert all((h in done) == (h in heights) for h in range(-5, 1030))
+    gaps = {h for a, b in done.missing(0, 1030) for h in range(a, b + 1)}
+    assert gaps == set(range(0, 1031)) - heights
+    for (_, hi), (lo, _) in zip(done.ranges(), done.ranges()[1:]):
+        assert lo > hi + 1
+
+
+# ------------------------------------------------------------
+# State file (hub_fee_monitor_v41)
+# ------------------------------------------------------------
+
+@pytest.fixture
+def hub(tmp_path, monkeypatch):
+    import hub_fee_monitor_v41
+    monkeypatch.chdir(tmp_path)
+    return hub_fee_monitor_v41
+
+
+def test_legacy_state_reads_as_single_height(hub):
+    with open(hub.STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump({"last_height": 1234}, f)
+    state = hub.load_state()
+    assert state["last_height"] == 1234
+    assert state["done"].ranges() == [[1234, 1234]]
+
+    hub.save_state(1300, first=1235)
+    with open(hub.STATE_FILE, encoding="utf-8") as f:
+        assert json.load(f) == {"last_height": 1300, "done": [[1234, 1300]]}
+
+
+def test_save_state_keeps_holes(hub):
+    assert hub.load_state() is None
+    hub.save_state(200, first=101)
+    hub.save_state(400, first=301)
+    state = hub.load_state()
+    assert state["last_height"] == 400
+    assert state["done"].ranges() == [[101, 200], [301, 400]]
+
+
+def test_backfill_below_cursor_keeps_cursor_at_head(hub):
+    with open(hub.STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump({"last_height": 5000}, f)
+    hub.save_state(6000, first=5001)
+    hub.mark_done([(100, 200)])
+    state = hub.load_state()
+    assert state["last_height"] == 6000
+    assert state["done"].ranges() == [[100, 200], [5000, 6000]]
+
+
+def test_mark_done_exclusive_refuses_done_heights(hub):
+    hub.mark_done([(1, 100)])
+    with pytest.raises(RuntimeError):
+        hub.mark_done([(150, 160), (90, 120)], exclusive=True)
+    assert hub.load_state()["done"].ranges() == [[1, 100]]
+    hub.mark_done([(101, 120)], exclusive=True)
+    assert hub.load_state()["done"].ranges() == [[1, 120]]
+
+
+def test_mark_done_inside_state_lock(hub):
+    with hub.state_lock():
+        hub.mark_done([(1, 10)])
+        with hub.state_lock():
+            hub.save_state(20, first=11)
+    assert hub.load_state()["done"].ranges() == [[1, 20]]
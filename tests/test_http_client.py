@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+import http_client
+
+
+@pytest.fixture(autouse=True)
+def budget(monkeypatch):
+    monkeypatch.setattr(http_client, "hedge_budget", http_client.HedgeBudget(ratio=1.0, burst=10))
+
+
+def test_fast_primary_fires_no_hedge():
+    calls = []
+    assert http_client.hedged(lambda: "primary", lambda: calls.append(1), 0.5) == "primary"
+    time.sleep(0.6)
+    assert calls == []
+    assert http_client.hedge_budget.fired == 0
+
+
+def test_slow_primary_fires_backup_but_keeps_its_answer():
+    def primary():
+        time.sleep(0.3)
+        return "primary"
+    assert http_client.hedged(primary, lambda: "backup", 0.05) == "primary"
+    assert http_client.hedge_budget.fired == 1
+
+
+def test_failed_primary_uses_fired_backup():
+    def primary():
+        time.sleep(0.2)
+        raise ConnectionError("down")
+    assert http_client.hedged(primary, lambda: "backup", 0.05) == "backup"
+    assert http_client.hedge_budget.won == 1
+
+
+def test_failed_primary_without_hedge_raises_its_error():
+    def primary():
+        raise ConnectionError("down")
+    with pytest.raises(ConnectionError):
+        http_client.hedged(primary, lambda: "backup", 5.0)
+    assert http_client.hedge_budget.fired == 0
+
+
+def test_delay_counts_from_primary_start_not_from_queueing(monkeypatch):
+    # pool saturé : la tâche de hedge démarre en retard, le primaire rapide a déjà répondu
+    monkeypatch.setattr(http_client, "_hedge_pool", http_client.ThreadPoolExecutor(max_workers=1))
+    blocker = http_client._hedge_pool.submit(time.sleep, 0.3)
+    assert http_client.hedged(lambda: "primary", lambda: "backup", 0.05) == "primary"
+    blocker.result()
+    assert http_client.hedge_budget.fired == 0